@@ -1,23 +1,52 @@
 import paho.mqtt.client as mqtt
-import os
-import time
+import threading
 
-MQTT_BROKER = "10.42.0.1"
-MQTT_PORT = 1883
-MQTT_TOPIC = 'Initiate Transfer'
+import Transferdata
+import transfersession
 
+MQTT_BROKER = Transferdata.MQTT_BROKER
+MQTT_PORT = Transferdata.MQTT_PORT
+MQTT_TOPIC = transfersession.START_TOPIC
+
+# Sessions currently being sent; a repeated start (e.g. after the receiver reconnects) is ignored
+running_sessions = set()
+running_lock = threading.Lock()
+
+
+def run_session(client, session_id):
+    try:
+        statuses = transfersession.run_session(
+            client, session_id, Transferdata.DB_PATH, Transferdata.TABLES, Transferdata.MQTT_TOPIC_PREFIX
+        )
+        print(f"Session {session_id} finished: {statuses}")
+    except Exception as e:
+        print(f"Session {session_id} failed: {e}")
+    finally:
+        with running_lock:
+            running_sessions.discard(session_id)
 
 def on_connect(client, userdata, flags, reason_code, properties):
     if reason_code.is_failure:
         print(f"Failed to connect: {reason_code}. loop_forever() will retry connection")
     else:
-        client.subscribe(MQTT_TOPIC)
+        client.subscribe([(MQTT_TOPIC, 1), (transfersession.ACK_TOPIC.format("#"), 1)])
         print("Connected and subscribed to topic")
 
 def on_message(client, userdata, message):
-    if message.payload.decode() == "Start":
-        print('Starting')
-        os.system('python /home/Mainhub/Transferdata.py')
+    if message.topic != MQTT_TOPIC:
+        transfersession.handle_ack(message.topic, message.payload)
+        return
+
+    session_id = transfersession.parse_start(message.payload)
+    if session_id is None:
+        return
+    with running_lock:
+        if session_id in running_sessions:
+            return
+        running_sessions.add(session_id)
+    print(f'Starting session {session_id}')
+    # Send from a worker thread so this network thread keeps delivering acks
+    threading.Thread(target=run_session, args=(client, session_id), name=f"transfer-{session_id}", daemon=True).start()
 
 def on_subscribe(client, userdata, mid, reason_code_list, properties):
     if reason_code_list[0].is_failure:
@@ -31,18 +60,22 @@ def on_unsubscribe(client, userdata, mid, reason_code_list, properties):
     else:
         print(f"Broker replied with failure: {reason_code_list[0]}")
 
-if __name__ == "__main__":
+def main():
     client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
     client.on_connect = on_connect
     client.on_message = on_message
     client.on_subscribe = on_subscribe
     client.on_unsubscribe = on_unsubscribe
+    client.reconnect_delay_set(min_delay=1, max_delay=30)
 
     client.connect(MQTT_BROKER, MQTT_PORT, 60)
-    client.loop_start()
 
-    # Wait for59 seconds to receive the message
-    time.sleep(59)
+    # Stay up to serve start requests; loop_forever() reconnects after broker drops
+    try:
+        client.loop_forever()
+    except KeyboardInterrupt:
+        print("\nKeyboard interrupt detected. Transfer listener stopped.")
+        client.disconnect()
 
-    client.loop_stop()
-    client.disconnect()
+if __name__ == "__main__":
+    main()
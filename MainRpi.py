@@ -4,7 +4,8 @@ import json
 import os
 import paho.mqtt.client as mqtt
 import requests
-import ast
+
+import sensorcodec
 # Initialize GPIO for relay control
 RELAY_PIN = 19
 GPIO.setmode(GPIO.BCM)
@@ -71,8 +72,7 @@ def on_message(client, userdata, msg):
     global mqtt_values
 
     try:
-        data_str = msg.payload.decode("utf-8")  # Convert the MQTT message to a string
-        data_dict = ast.literal_eval(data_str)  # Safely evaluate the string as a dictionary
+        data_dict = sensorcodec.decode(msg.payload)  # Binary, JSON or legacy repr payload
         print(f"Received MQTT values: {data_dict}")
 
         if "PM2.5" in data_dict:
@@ -1,9 +1,12 @@
-import RPi.GPIO as GPIO
 import time
-from sps30 import SPS30
 from collections import deque
 from datetime import datetime, timedelta
 
+import hardware
+
+# RPi.GPIO, or the simulated GPIO with SAPPHIRES_HARDWARE=sim
+GPIO = hardware.GPIO
+
 # Set up GPIO
 RELAY_PIN = 25
 GPIO.setwarnings(False)
@@ -11,11 +14,11 @@ GPIO.setmode(GPIO.BCM)
 GPIO.setup(RELAY_PIN, GPIO.OUT)
 
 # Initialize SPS30 sensor
-sps = SPS30(port=1)  # Use port=1 for the default I2C interface
+sps = hardware.SPS30(port=1)  # Use port=1 for the default I2C interface
 
 def setup_sps30():
     sps.start_measurement()
-    time.sleep(2)  # Add a delay of 2 seconds before reading measured values
+    hardware.sleep(2)  # Add a delay of 2 seconds before reading measured values
 
 def read_sps30_data():
     sps.read_measured_values()
@@ -48,22 +51,22 @@ LOG_FILE = "SPS30Read.txt"
 BASELINE_LOG_FILE = "SPS30Baseline.txt"
 
 # Baseline reset configuration
-baseline_reset_time = datetime.now() + timedelta(days=BASELINE_RESET_INTERVAL)
+baseline_reset_time = datetime.fromtimestamp(hardware.now()) + timedelta(days=BASELINE_RESET_INTERVAL)
 
 # Main loop
 try:
     setup_sps30()
-    start_time = time.time()
+    start_time = hardware.now()
     baseline_start_time = start_time
     while True:
-        current_time = time.time()
+        current_time = hardware.now()
         elapsed_time = current_time - start_time
 
         # Check if it's time to reset the baseline
-        if datetime.now() >= baseline_reset_time:
+        if datetime.fromtimestamp(hardware.now()) >= baseline_reset_time:
             is_baseline_collected = False
             baseline_data = []
-            baseline_reset_time = datetime.now() + timedelta(days=BASELINE_RESET_INTERVAL)
+            baseline_reset_time = datetime.fromtimestamp(hardware.now()) + timedelta(days=BASELINE_RESET_INTERVAL)
             print("Baseline reset.")
 
         # Read PM2.5 data from SPS30 sensor
@@ -75,7 +78,7 @@ try:
             with open(BASELINE_LOG_FILE, "a") as f:
                 if len(baseline_data) == 1:
                     f.write("Timestamp | PM2.5\n")
-                timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+                timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(hardware.now()))
                 log_entry = f"{timestamp} | {pm25}\n"
                 f.write(log_entry)
             print("Collecting baseline data...")
@@ -108,7 +111,7 @@ try:
             with open(LOG_FILE, "a") as f:
                 if len(baseline_data) == 1:
                     f.write("Timestamp | PM2.5 | Baseline | Relay State\n")
-                timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+                timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(hardware.now()))
                 log_entry = f"{timestamp} | {pm25} | {baseline} | {'ON' if relay_state else 'OFF'}\n"
                 f.write(log_entry)
 
@@ -119,7 +122,7 @@ try:
         print("Relay State:", "ON" if relay_state else "OFF")
 
         # Wait for 5 seconds before the next reading
-        time.sleep(5)
+        hardware.sleep(5)
 
 except KeyboardInterrupt:
     sps.stop_measurement()
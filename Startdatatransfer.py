@@ -1,18 +1,19 @@
 import paho.mqtt.client as mqtt
 import sqlite3
-import ast
+import json
+import sys
+
+import sapphiresdb
+import hubtransfer
+import transfersession
 
 MQTT_BROKER = "10.42.0.1"
 MQTT_PORT = 1883
+MQTT_TOPIC_PREFIX = 'Transfer data'
 
-def on_publish(client, userdata, result):
-    pass
-
-client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-client.on_publish = on_publish
-client.connect(MQTT_BROKER, MQTT_PORT, 60)
-
-client.publish('Initiate Transfer', 'Start', qos=1)
+# One session per run; re-sent on reconnect so the hub resumes the same session
+SESSION_ID = transfersession.new_session_id()
+PROGRESS_TOPIC = transfersession.PROGRESS_TOPIC.format(SESSION_ID)
 
 TOPICS_TABLES = {
     'Transfer dataZeroW1': 'dataZeroW1',
@@ -26,69 +27,119 @@ DB_PATH = '/Users/carsenhobson/downloads/new_mqtt_data.db'
 
 # Create tables in the new database
 def create_tables():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    for table in TOPICS_TABLES.values():
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS {table} (
-                column1 INTEGER,  -- Adjust columns and types as per your data
-                column2 REAL,
-                column3 REAL,
-                column4 REAL,
-                column5 REAL
-            )
-        ''')
-    conn.commit()
-    conn.close()
-
-# Insert data into the appropriate SQLite database table
-def insert_data_to_db(table_name, data):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    conn = sapphiresdb.get_connection(DB_PATH)
+    with conn:
+        for table in TOPICS_TABLES.values():
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    column1 INTEGER,  -- Adjust columns and types as per your data
+                    column2 REAL,
+                    column3 REAL,
+                    column4 REAL,
+                    column5 REAL,
+                    source_rowid INTEGER  -- rowid on the hub, makes re-sent rows no-ops
+                )
+            ''')
+            # Tables created before incremental transfer lack source_rowid
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+            if "source_rowid" not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN source_rowid INTEGER")
+            conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_source_rowid ON {table} (source_rowid)")
+
+# Hub table -> final status ("complete" or "failed") reported by the hub this session
+done_tables = {}
+
+# Insert a chunk of (source_rowid, column1..column5) rows in one transaction; None on failure
+def insert_data_to_db(table_name, rows):
+    conn = sapphiresdb.get_connection(DB_PATH)
     try:
-        cursor.execute(f"INSERT INTO {table_name} (column1, column2, column3, column4, column5) VALUES (?, ?, ?, ?, ?)", data)
-        conn.commit()
+        with conn:
+            before = conn.total_changes
+            conn.executemany(
+                f"INSERT OR IGNORE INTO {table_name} (source_rowid, column1, column2, column3, column4, column5) "
+                f"VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            return conn.total_changes - before
     except sqlite3.Error as e:
         print(f"An error occurred: {e}")
-    finally:
-        conn.close()
+        return None
 
 # MQTT on_connect callback
 def on_connect(client, userdata, flags, rc, properties):
     if rc == 0:
         print("Connected to MQTT Broker!")
-        for topic in TOPICS_TABLES.keys():
-            client.subscribe(topic)
+        client.subscribe([(topic, 1) for topic in TOPICS_TABLES] + [(PROGRESS_TOPIC, 1)])
+        client.publish(transfersession.START_TOPIC, transfersession.encode_start(SESSION_ID), qos=1)
+        print(f"Requested transfer session {SESSION_ID}")
     else:
         print(f"Failed to connect, return code {rc}")
 
 # MQTT on_message callback
 def on_message(client, userdata, msg):
-    payload = msg.payload.decode()
     topic = msg.topic
-    table_name = TOPICS_TABLES.get(topic)
+    if topic == PROGRESS_TOPIC:
+        handle_progress(client, msg.payload)
+        return
 
+    table_name = TOPICS_TABLES.get(topic)
     if table_name:
+        hub_table = topic[len(MQTT_TOPIC_PREFIX):]
+        ack_topic = transfersession.ACK_TOPIC.format(SESSION_ID)
         try:
-            data = ast.literal_eval(payload)  # Convert string back to tuple
-            if isinstance(data, tuple) and len(data) == 5:
-                insert_data_to_db(table_name, data)
-                print(f"Inserted data into {table_name}: {data}")
+            rows = hubtransfer.decode_chunk(msg.payload)
+            if rows and all(len(row) == 6 for row in rows):
+                chunk_id, last_rowid = transfersession.chunk_range(msg.payload, rows)
+                inserted = insert_data_to_db(table_name, rows)
+                # Acknowledge only once the rows are committed; a failed insert asks for a resend
+                client.publish(ack_topic, transfersession.encode_ack(hub_table, chunk_id, last_rowid, inserted is not None), qos=1)
+                print(f"Inserted {inserted} of {len(rows)} rows into {table_name}")
             else:
-                print(f"Invalid data format: {data}")
-        except (ValueError, SyntaxError) as e:
-            print(f"Error parsing data: {e}")
+                print(f"Invalid data format in chunk for {table_name}")
+        except ValueError as e:
+            header = hubtransfer.read_chunk_header(msg.payload)
+            chunk = f" (chunk {header[0]}, rows up to {header[1]})" if header else ""
+            print(f"Error parsing data{chunk}: {e}")
+            if header:
+                client.publish(ack_topic, transfersession.encode_ack(hub_table, header[0], header[1], False), qos=1)
     else:
         print(f"No matching table for topic: {topic}")
 
+def handle_progress(client, payload):
+    try:
+        progress = json.loads(payload)
+    except json.JSONDecodeError:
+        return
+    eta = progress["eta_seconds"]
+    eta_text = f"{eta:.0f}s" if eta is not None else "unknown"
+    print(f"{progress['table']}: {progress['acked_rows']}/{progress['total_rows']} rows, "
+          f"{progress['rows_per_second']:.0f} rows/s, ETA {eta_text}")
+    if progress["done"]:
+        # Hubs predating the status field only reported finished tables
+        status = progress.get("status") or "complete"
+        done_tables[progress["table"]] = status
+        if status != "complete":
+            print(f"{progress['table']}: transfer {status} on the hub after {progress['acked_rows']} rows")
+        if len(done_tables) >= len(TOPICS_TABLES):
+            failed = [table for table, status in done_tables.items() if status != "complete"]
+            if failed:
+                print(f"Transfer session {SESSION_ID} failed for {', '.join(failed)}; run again to resume")
+            else:
+                print(f"Transfer session {SESSION_ID} complete")
+            client.disconnect()
+
 # Main function to setup MQTT client and start loop
 def main():
     create_tables()
     client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
     client.on_connect = on_connect
     client.on_message = on_message
+    client.reconnect_delay_set(min_delay=1, max_delay=30)
     client.connect(MQTT_BROKER, MQTT_PORT, 60)
+    # Returns once the hub reports every table done; reconnects after broker drops
     client.loop_forever()
+    if any(status != "complete" for status in done_tables.values()):
+        sys.exit(1)
 
 
 if __name__ == '__main__':
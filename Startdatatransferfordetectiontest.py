@@ -1,6 +1,7 @@
 import paho.mqtt.client as mqtt
 import sqlite3
-import ast
+
+import sensorcodec
 
 MQTT_BROKER = "10.42.0.1"
 MQTT_PORT = 1883
@@ -59,8 +60,7 @@ def on_connect(client, userdata, flags, rc, properties):
 
 # MQTT on_message callback
 def on_message(client, userdata, msg):
-    payload = msg.payload.decode()
-    data = ast.literal_eval(payload)  # Convert string back to tuple
+    data = sensorcodec.decode_row(msg.payload)
 
 
 # Main function to setup MQTT client and start loop
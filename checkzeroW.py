@@ -1,69 +1,140 @@
-import sqlite3
+import sys
 import time
+import sqlite3
+import logging
 import paho.mqtt.client as mqtt
 
+import sapphiresdb
+import nodehealth
+
 DATABASE_NAME = 'mqtt_data.db'
 MQTT_BROKER = "10.42.0.1"
 MQTT_PORT = 1883
 MQTT_USERNAME = "SAPPHIRE"
 MQTT_PASSWORD = "SAPPHIRE"
 
-def on_publish(client, userdata, result):
+# A node not heard from for this many seconds is stale
+STALE_AFTER = 600
+# Wait after a reboot before rebooting the same node again; doubles with each
+# reboot that did not bring the node back, up to BACKOFF_MAX
+BACKOFF_BASE = 600
+BACKOFF_MAX = 6 * 3600
+# Reboots allowed across all nodes in any rolling hour
+MAX_REBOOTS_PER_HOUR = 4
+# Seconds between checks when run with --watch
+CHECK_INTERVAL = 60
+
+def on_publish(client, userdata, mid, reason_code=None, properties=None):
     pass
 
 client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
 client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
 client.on_publish = on_publish
-client.connect(MQTT_BROKER, MQTT_PORT, 60)
 
-def get_latest_timestamp():
-    query_template = "SELECT timestamp FROM {} ORDER BY timestamp DESC LIMIT 1"
-    tables = ["ZeroW1", "ZeroW2", "ZeroW3", "ZeroW4"]
-    latest_values = {}
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        for table in tables:
-            cursor.execute(query_template.format(table))
-            result = cursor.fetchone()
-            latest_values[table] = result[0] if result else None
-    
-    return latest_values
+def get_latest_timestamp(nodes):
+    """
+    Return {node: last seen epoch seconds or None} from the last_seen table.
+    Nodes missing from last_seen (data ingested before it existed) are seeded once from their table.
+    """
+    latest_values = sapphiresdb.get_last_seen(DATABASE_NAME)
+    conn = sapphiresdb.get_connection(DATABASE_NAME)
+    for node in nodes:
+        if node in latest_values:
+            continue
+        try:
+            timestamp = conn.execute(f"SELECT MAX(timestamp) FROM {node}").fetchone()[0]
+        except sqlite3.OperationalError:
+            timestamp = None
+        if timestamp is not None:
+            sapphiresdb.update_last_seen(node, timestamp, DATABASE_NAME)
+        latest_values[node] = timestamp
+    return {node: latest_values.get(node) for node in nodes}
 
-def check_timestamps_older_than_10_minutes(latest_values):
-    current_time = int(time.time())
-    ten_minutes_ago = current_time - 600
+def check_timestamps_older_than_10_minutes(latest_values, current_time=None):
+    current_time = int(time.time()) if current_time is None else current_time
+    stale_before = current_time - STALE_AFTER
     older_than_10_minutes = {}
     for table, timestamp in latest_values.items():
         if timestamp is not None:
-            older_than_10_minutes[table] = timestamp < ten_minutes_ago
+            older_than_10_minutes[table] = timestamp < stale_before
         else:
             older_than_10_minutes[table] = False
-    
+
     return older_than_10_minutes
 
-def reset_mqtt_by_number(table_number):
-    table_mapping = {
-        1: "ZeroW1",
-        2: "ZeroW2",
-        3: "ZeroW3",
-        4: "ZeroW4"
-    }
-    table = table_mapping.get(table_number)
-    if table:
-        latest_values = get_latest_timestamp()
-        older_than_10_minutes = check_timestamps_older_than_10_minutes(latest_values)
-        if older_than_10_minutes.get(table, False):
-            client.publish('Reset4', 'reboot', qos=1)
-            print(f"Reset{table_number}")
-        else:
-            print(f"{table} does not need reset")
-    else:
-        print("Invalid table number. Please provide a number between 1 and 4.")
+def get_reboot_delay(node, last_seen, current_time):
+    """
+    Return seconds until node may be rebooted again (0 if allowed now).
 
-if __name__ == '__main__':
-    for i in range(1, 5):
-        reset_mqtt_by_number(i)
+    Reboots since the node was last seen count as failed attempts; each one
+    doubles the wait from the previous reboot.
+    """
+    conn = sapphiresdb.get_connection(DATABASE_NAME)
+    attempts, last_reboot = conn.execute(
+        "SELECT COUNT(*), MAX(timestamp) FROM reboot_log WHERE node = ? AND timestamp > ?",
+        (node, last_seen)
+    ).fetchone()
+    if not attempts:
+        return 0
+    backoff = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return max(0, last_reboot + backoff - current_time)
 
+def reboots_in_last_hour(current_time):
+    conn = sapphiresdb.get_connection(DATABASE_NAME)
+    return conn.execute("SELECT COUNT(*) FROM reboot_log WHERE timestamp > ?", (current_time - 3600,)).fetchone()[0]
 
+def reset_stale_nodes():
+    """Publish "reboot" to the reset topic of every stale node, subject to backoff and the hourly limit."""
+    nodes = nodehealth.load_nodes()
+    current_time = int(time.time())
+    latest_values = get_latest_timestamp(nodes)
+    older_than_10_minutes = check_timestamps_older_than_10_minutes(latest_values, current_time)
 
+    for node, stale in older_than_10_minutes.items():
+        if not stale:
+            print(f"{node} does not need reset")
+            continue
+        delay = get_reboot_delay(node, latest_values[node], current_time)
+        if delay:
+            print(f"{node} is stale, next reboot allowed in {delay}s")
+            continue
+        if reboots_in_last_hour(current_time) >= MAX_REBOOTS_PER_HOUR:
+            logging.warning(f"{node} is stale but {MAX_REBOOTS_PER_HOUR} reboots were already sent this hour")
+            continue
+        reset_topic = nodes[node]["reset_topic"]
+        info = client.publish(reset_topic, 'reboot', qos=1)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            # Not queued (e.g. broker down): nothing will be sent, try again next check
+            logging.warning(f"{node} is stale but the reboot could not be sent: {mqtt.error_string(info.rc)}")
+            continue
+        try:
+            info.wait_for_publish(timeout=5)
+        except (RuntimeError, ValueError) as e:
+            logging.warning(f"Error waiting for the reboot of {node} to be delivered: {e}")
+        # A queued QoS 1 message is still delivered after a reconnect, so it counts
+        # as an attempt for the backoff and the hourly limit either way
+        sapphiresdb.insert_reboot_log(node, current_time, DATABASE_NAME)
+        if info.is_published():
+            print(f"{reset_topic}: rebooting {node}, last seen {current_time - latest_values[node]}s ago")
+        else:
+            logging.warning(f"{reset_topic}: reboot of {node} not acknowledged yet, counted as an attempt")
 
+if __name__ == '__main__':
+    sapphiresdb.create_tables(DATABASE_NAME, sapphiresdb.LIVENESS_SCHEMA)
+    # Connect in the background so the watcher also starts during a broker outage
+    client.connect_async(MQTT_BROKER, MQTT_PORT, 60)
+    client.loop_start()
+    try:
+        # python checkzeroW.py          one check (cron)
+        # python checkzeroW.py --watch  check every CHECK_INTERVAL seconds
+        while True:
+            reset_stale_nodes()
+            if "--watch" not in sys.argv[1:]:
+                break
+            time.sleep(CHECK_INTERVAL)
+    except KeyboardInterrupt:
+        print("\nKeyboard interrupt detected. Liveness watcher stopped.")
+    finally:
+        client.loop_stop()
+        client.disconnect()
+        sapphiresdb.close_connections()
@@ -1,3 +1,4 @@
+import os
 import dash
 from dash import dcc, html
 from dash.dependencies import Input, Output, State
@@ -6,38 +7,25 @@ from datetime import datetime
 import time
 import paho.mqtt.client as mqtt
 import logging
-import subprocess
+
+import nodehealth
 
 DATABASE_NAME = "mqtt_data.db"
 MQTT_BROKER = "10.42.0.1"
 MQTT_PORT = 1883
+# ZeroW nodes shown on the dashboard: name -> {"ip", "reset_topic"}
+NODES = nodehealth.load_nodes()
+# Readings averaged for the rolling Wi-Fi strength column
+WIFI_AVERAGE_READINGS = 30
+DEBUG = True
 
 def on_publish(client, userdata, result):
     pass
    
 
-def is_device_reachable(ip):
-    try:
-        output = subprocess.check_output(['ping', '-c', '1', ip])
-        if "1 received" in output.decode('utf-8'):
-            return True
-    except subprocess.CalledProcessError:
-        return False
-    return False
-
 def check_device_status():
-    device_ips = {
-        'ZeroW1': '10.42.0.114',
-        'ZeroW2': '10.42.0.107',
-        'ZeroW3': '10.42.0.37',
-        'ZeroW4': '10.42.0.48'
-    }
-
-    device_status = {}
-    for device, ip in device_ips.items():
-        device_status[device] = "Connected" if is_device_reachable(ip) else "Disconnected"
-    
-    return device_status
+    # Cached results from the nodehealth background prober; never blocks on the network
+    return nodehealth.get_device_status()
 
 
 
@@ -60,7 +48,7 @@ def get_latest_values():
     conn = sqlite3.connect(DATABASE_NAME)
     cursor = conn.cursor()
     latest_values = {}
-    tables = ["ZeroW1", "ZeroW2", "ZeroW3", "ZeroW4"]
+    tables = list(NODES)
 
     for table in tables:
         try:
@@ -68,12 +56,19 @@ def get_latest_values():
             result = cursor.fetchone()
             if result:
                 readable_timestamp = datetime.fromtimestamp(result[0]).strftime('%Y-%m-%d %H:%M:%S')
+                cursor.execute(
+                    f"SELECT AVG(wifi_strength) FROM "
+                    f"(SELECT wifi_strength FROM {table} ORDER BY timestamp DESC LIMIT ?)",
+                    (WIFI_AVERAGE_READINGS,)
+                )
+                wifi_average = cursor.fetchone()[0]
                 latest_values[table] = {
                     "timestamp": readable_timestamp,
                     "pm25": result[1],
                     "temperature": result[2],
                     "humidity": result[3],
                     "wifi_strength": result[4],
+                    "wifi_strength_avg": round(wifi_average, 1) if wifi_average is not None else None,
                 }
             else:
                 latest_values[table] = {
@@ -83,6 +78,7 @@ def get_latest_values():
                     "temperature": None,
                     "humidity": None,
                     "wifi_strength": None,
+                    "wifi_strength_avg": None,
                 }
         except Exception as e:
             latest_values[table] = {
@@ -92,6 +88,7 @@ def get_latest_values():
                 "temperature": None,
                 "humidity": None,
                 "wifi_strength": None,
+                "wifi_strength_avg": None,
             }
     conn.close()
     return latest_values
@@ -131,14 +128,16 @@ def update_dashboard(n):
                         html.Th("PM2.5", style={'background-color': '#343a40', 'color': 'white'}),
                         html.Th("Humidity", style={'background-color': '#343a40', 'color': 'white'}),
                         html.Th("Temperature (F)", style={'background-color': '#343a40', 'color': 'white'}),
-                        html.Th("Wifi Strength (%)", style={'background-color': '#343a40', 'color': 'white'})
+                        html.Th("Wifi Strength (%)", style={'background-color': '#343a40', 'color': 'white'}),
+                        html.Th(f"Wifi Avg of {WIFI_AVERAGE_READINGS} (%)", style={'background-color': '#343a40', 'color': 'white'})
                     ])),
                     html.Tbody(html.Tr([
                         html.Td(values['timestamp']),
                         html.Td(values['pm25']),
                         html.Td(values['humidity']),
                         html.Td(values['temperature']),
-                        html.Td(values['wifi_strength'])
+                        html.Td(values['wifi_strength']),
+                        html.Td(values['wifi_strength_avg'])
                     ]))
                 ], className='table table-striped table-bordered'),
                 html.Button('Reboot', id=f'{topic}-button', n_clicks=0, className='btn btn-warning mt-2')
@@ -150,7 +149,7 @@ def update_dashboard(n):
 
 @app.callback(
     Output('dummy-output', 'children'),
-    [Input(f'ZeroW{i+1}-button', 'n_clicks') for i in range(4)]
+    [Input(f'{node}-button', 'n_clicks') for node in NODES]
 )
 def handle_button_clicks(*args):
     ctx = dash.callback_context
@@ -163,12 +162,7 @@ def handle_button_clicks(*args):
     if button_id and n_clicks > 0:
         logging.debug(f"Button {button_id} clicked {n_clicks} times")
         # Determine topic and message based on button_id
-        topic_map = {
-            'ZeroW1-button': 'Reset1',
-            'ZeroW2-button': 'Reset2',
-            'ZeroW3-button': 'Reset3',
-            'ZeroW4-button': 'Reset4'
-        }
+        topic_map = {f'{node}-button': config['reset_topic'] for node, config in NODES.items()}
         
         topic = topic_map.get(button_id, 'default/topic')
         
@@ -178,7 +172,10 @@ def handle_button_clicks(*args):
 
 
 if __name__ == '__main__':
-    app.run_server(debug=True, host='0.0.0.0')
+    # With the debug reloader the parent process only watches files; probe from the serving child
+    if not DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        nodehealth.start_prober(NODES)
+    app.run_server(debug=DEBUG, host='0.0.0.0')
 
 
 
@@ -1,10 +1,10 @@
 import time
 import sys
-from sps30 import SPS30
-import Adafruit_BME280
 from datetime import datetime
 import sqlite3
 
+import hardware
+
 # Constants
 DATABASE_FILE_PATH = 'detectiontest.db'
 WINDOW_SIZE = 20  # Number of readings to consider
@@ -19,13 +19,13 @@ except sqlite3.Error as e:
 
 # Initialize sensors
 try:
-    sps = SPS30(1)
+    sps = hardware.SPS30(1)
 except Exception as e:
     print(f"Error initializing SPS30 sensor: {str(e)}")
     sys.exit(1)
 
 try:
-    bme280 = Adafruit_BME280.BME280(address=0x77)
+    bme280 = hardware.Adafruit_BME280.BME280(address=0x77)
 except Exception as e:
     print(f"Error initializing BME280 sensor: {str(e)}")
     sys.exit(1)
@@ -0,0 +1,89 @@
+import numpy as np
+
+###################################################
+# DOWNSAMPLING FOR LONG-RANGE PM2.5 CHARTS
+###################################################
+#
+# Both functions return the sorted indices of the points to keep, so callers
+# can slice lists, NumPy arrays or DataFrames (data.iloc[idx]) alike and keep
+# their own x values (datetimes, epoch seconds, ...).  x must be numeric and
+# ascending; pass epoch seconds or datetime64 values cast to int64.
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: pick n_out points that preserve the visual shape.
+
+    The first and last points are always kept.  Every other bucket contributes the
+    point forming the largest triangle with the previously kept point and the
+    mean of the next bucket, which keeps spikes that plain decimation drops.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets over the interior points [1, n - 1)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start = edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, n_buckets):
+    """
+    Keep the minimum and maximum of each of n_buckets equal-width buckets.
+
+    Returns at most 2 * n_buckets + 2 indices.  Cheaper than LTTB and guarantees
+    every peak and trough survives, at the cost of a busier line.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if 2 * n_buckets >= n or n_buckets < 1:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    keep = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        bucket = y[start:end]
+        keep.append(start + int(np.nanargmin(bucket)) if not np.isnan(bucket).all() else start)
+        keep.append(start + int(np.nanargmax(bucket)) if not np.isnan(bucket).all() else start)
+    return np.unique(keep)
+
+
+def downsample(x, y, n_out, method="lttb"):
+    """
+    Return (x, y) reduced to about n_out points.
+
+    Parameters:
+        x (sequence): Ascending numeric x values.
+        y (sequence): Values to plot.
+        n_out (int): Point budget.
+        method (str): "lttb" or "minmax".
+    """
+    if method == "minmax":
+        idx = minmax_indices(y, max(n_out // 2 - 1, 1))
+    else:
+        idx = lttb_indices(x, y, n_out)
+    x = np.asarray(x)
+    y = np.asarray(y)
+    return x[idx], y[idx]
@@ -1,8 +1,9 @@
 import paho.mqtt.client as mqtt
 import time
-import sqlite3
 from datetime import datetime
-import ast
+
+import sapphiresdb
+import sensorcodec
 
 # Define the MQTT broker and topic
 broker_address = "10.42.1.1"
@@ -15,31 +16,17 @@ db_file = 'SAPPHIRES.db'
 
 # Function to insert data into the database
 def insert_data(pm25_value, temperature, humidity, wifi_strength):
-    conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
-
-    # Get the current timestamp
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # Insert the PM2.5 value into the database
-    cursor.execute('''
-        INSERT INTO Outdoor (timestamp, pm25_value, temperature, humidity, wifi_strength)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (timestamp, pm25_value, temperature, humidity, wifi_strength))
-
-    # Commit the changes and close the connection
-    conn.commit()
-    conn.close()
+    # Insert the PM2.5 value into the database on the pooled connection (epoch timestamp)
+    sapphiresdb.insert_outdoor(pm25_value, temperature, humidity, wifi_strength, db_path=db_file)
 
 # Callback function to handle incoming messages
 def on_message(client, userdata, message):
     global data_values
-    payload = message.payload.decode("utf-8").strip()
-    print(f"Received message: '{payload}'")
-    payload_dict = ast.literal_eval(payload)
-
     try:
-        if "PM2.5" in payload:
+        payload_dict = sensorcodec.decode(message.payload)
+        print(f"Received message: {payload_dict}")
+
+        if "PM2.5" in payload_dict:
             data_values["pm2.5"] = payload_dict["PM2.5"]
         if "Temperature (F)" in payload_dict:
             data_values["temperature"] = payload_dict["Temperature (F)"]
@@ -51,7 +38,7 @@ def on_message(client, userdata, message):
         insert_data(data_values["pm2.5"], data_values["temperature"], data_values["humidity"], data_values["Wifi Strength"])
 
     except ValueError:
-        print("Received message is not a valid floating-point number.")
+        print("Received message is not a valid sensor reading.")
 
 # Callback function to confirm subscription
 def on_subscribe(client, userdata, mid, granted_qos):
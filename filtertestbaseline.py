@@ -1,6 +1,9 @@
 import sqlite3
 import sys
 import datetime  # For timestamp calculations
+import time
+
+import rollups
 
 # Database file path
 db_file = 'pm25_data.db'  # Replace with your actual database file path
@@ -34,24 +37,12 @@ def check_filter_state_on_last_60_minutes():
         print("Filter state was ON in the last 60 minutes. Exiting the script.")
         sys.exit()
 
-def get_last_60_pm25_values():
-    # Connect to the SQLite database
-    conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
-
-    # Fetch the last 60 PM2.5 values (sorted by timestamp in descending order)
-    cursor.execute('''
-        SELECT pm25_value FROM pm25_data
-        ORDER BY timestamp DESC
-        LIMIT 60
-    ''')
-    results = cursor.fetchall()
-
-    # Close the connection
-    conn.close()
-
-    # Return a list of the PM2.5 values (ignoring the SQL tuples)
-    return [row[0] for row in results]
+def get_last_60_minutes_pm25_mean():
+    # Fold any new pm25_data rows into the rollups, then average the last hour
+    # from the 1-minute buckets instead of re-reading the raw rows
+    rollups.catch_up(db_file, ["pm25_data"])
+    current_time = int(time.time())
+    return rollups.get_mean(db_file, "pm25_data", current_time - 3600, current_time + 1)
 
 def check_baseline_value(latest_baseline):
     try:
@@ -110,11 +101,8 @@ def main():
     # Step 1: Check if any filter_state is "ON" in the last 60 minutes, and exit if true
     check_filter_state_on_last_60_minutes()
 
-    # Step 2: Get the last 60 PM2.5 values
-    pm25_values = get_last_60_pm25_values()
-
-    # Step 3: Calculate the average of those values
-    average_pm25 = calculate_average(pm25_values)
+    # Step 2 and 3: Get the average PM2.5 of the last 60 minutes from the rollups
+    average_pm25 = get_last_60_minutes_pm25_mean() or 0.0
 
     # Step 4: Create the baseline table if it doesn't exist
     create_baseline_table()
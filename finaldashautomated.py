@@ -2,12 +2,18 @@ import dash
 from dash import dcc, html, callback_context
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output, State
-import sqlite3
-import pandas as pd
 import plotly.graph_objs as go
 import datetime
-import base64
+import time
 import os
+import flask
+import threading
+from collections import deque
+import numpy as np
+
+import sapphiresdb
+import downsample
+import rollups
 
 ###################################################
 # GLOBAL CONFIGURATION & CONSTANTS
@@ -39,6 +45,36 @@ EMOJI_PATHS = {
     "hazardous": "/home/mainhubs/hazardous.png"
 }
 
+# Emoji images are held in memory and served at /emoji/<name>.png; the files are
+# re-checked for changes at most this often (seconds).
+EMOJI_CHECK_INTERVAL = 60
+
+# Historical page: points kept per trace, and how often new rows are streamed to it (ms)
+HISTORY_MAX_POINTS = 500
+HISTORY_REFRESH_INTERVAL = 10 * 1000
+
+# Longer ranges are read from SQLite and reduced to this many points per trace
+HISTORY_POINT_BUDGET = 1000
+HISTORY_DOWNSAMPLE_METHOD = "lttb"  # or "minmax"
+
+# Range selector on the historical page: value -> (label, seconds; None = live cache)
+HISTORY_RANGES = {
+    "live": ("Recent", None),
+    "24h": ("24 Hours", 24 * 3600),
+    "7d": ("7 Days", 7 * 24 * 3600),
+    "30d": ("30 Days", 30 * 24 * 3600),
+    "90d": ("90 Days", 90 * 24 * 3600),
+}
+
+# The 30-60 minute deltas read the Indoor/Outdoor rollups; fold new rows in at most this often (seconds)
+ROLLUP_CATCH_UP_INTERVAL = 60
+
+# table -> PM2.5 column plotted on the historical page (trace order matters for extendData)
+HISTORY_TABLES = {
+    "Indoor": "pm25",
+    "Outdoor": "pm25_value",
+}
+
 
 ###################################################
 # HELPER FUNCTIONS
@@ -49,74 +85,53 @@ def create_tables():
     Create the necessary tables if they do not exist.
     Ensures the environment is ready for data storage.
     """
-    create_tables_script = """
-    CREATE TABLE IF NOT EXISTS Indoor (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT,
-        pm25 REAL,
-        temperature REAL,
-        humidity REAL
-    );
-
-    CREATE TABLE IF NOT EXISTS baseline (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT,
-        baseline_value REAL
-    );
-
-    CREATE TABLE IF NOT EXISTS user_control (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT,
-        user_input TEXT
-    );
-
-    CREATE TABLE IF NOT EXISTS filter_state (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT,
-        filter_state TEXT
-    );
-
-    CREATE TABLE IF NOT EXISTS Outdoor (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT,
-        pm25_value REAL,
-        temperature REAL,
-        humidity REAL,
-        wifi_strength REAL
-    );
-    """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.executescript(create_tables_script)
-        conn.commit()
-        conn.close()
+        sapphiresdb.create_tables(DB_PATH)
     except Exception as e:
         print(f"Error creating tables: {e}")
 
 
-def encode_image(image_path):
+# name -> {"data": PNG bytes, "mtime": file modification time}
+emoji_cache = {}
+emoji_last_checked = 0
+
+
+def load_emoji_assets():
+    """
+    Read the EMOJI_PATHS images into memory, skipping any whose file is unchanged.
+    Also serves as the invalidation hook: call it after replacing an image.
+    """
+    global emoji_last_checked
+    emoji_last_checked = time.time()
+    for name, image_path in EMOJI_PATHS.items():
+        try:
+            mtime = os.path.getmtime(image_path)
+            cached = emoji_cache.get(name)
+            if cached and cached["mtime"] == mtime:
+                continue
+            with open(image_path, "rb") as f:
+                emoji_cache[name] = {"data": f.read(), "mtime": mtime}
+        except OSError as e:
+            print(f"Error loading image {image_path}: {e}")
+            emoji_cache.pop(name, None)
+
+
+def emoji_url(name):
     """
-    Encode an image at a given path into base64 for embedding in the dashboard.
+    Return the cache-busting URL for a cached emoji image.
 
     Parameters:
-        image_path (str): The full path to the image file.
+        name (str): Key in EMOJI_PATHS.
 
     Returns:
-        str: Base64 encoded image string, or a placeholder if file not found.
+        str: URL such as "/emoji/good.png?v=1718000000", or "" if the image is missing.
     """
-    if not os.path.exists(image_path):
-        # If the file does not exist, return a blank image or handle gracefully
-        print(f"File not found: {image_path}")
-        return ""
-
-    try:
-        with open(image_path, "rb") as f:
-            encoded = base64.b64encode(f.read()).decode("ascii")
-        return f"data:image/png;base64,{encoded}"
-    except Exception as e:
-        print(f"Error encoding image {image_path}: {e}")
+    if time.time() - emoji_last_checked >= EMOJI_CHECK_INTERVAL:
+        load_emoji_assets()
+    cached = emoji_cache.get(name)
+    if not cached:
         return ""
+    return f"/emoji/{name}.png?v={int(cached['mtime'])}"
 
 
 def get_aqi_emoji(aqi):
@@ -127,21 +142,21 @@ def get_aqi_emoji(aqi):
         aqi (int): AQI value.
 
     Returns:
-        str: base64-encoded image string for the corresponding emoji.
+        str: URL of the cached emoji image for the corresponding AQI band.
     """
     try:
         if aqi <= 25:
-            return encode_image(EMOJI_PATHS["good"])
+            return emoji_url("good")
         elif 26 <= aqi <= 50:
-            return encode_image(EMOJI_PATHS["moderate"])
+            return emoji_url("moderate")
         elif 51 <= aqi <= 75:
-            return encode_image(EMOJI_PATHS["unhealthy_sensitive"])
+            return emoji_url("unhealthy_sensitive")
         elif 76 <= aqi <= 100:
-            return encode_image(EMOJI_PATHS["unhealthy"])
+            return emoji_url("unhealthy")
         elif 101 <= aqi <= 125:
-            return encode_image(EMOJI_PATHS["very_unhealthy"])
+            return emoji_url("very_unhealthy")
         else:
-            return encode_image(EMOJI_PATHS["hazardous"])
+            return emoji_url("hazardous")
     except Exception as e:
         print(f"Error selecting emoji for AQI {aqi}: {e}")
         return ""
@@ -171,6 +186,102 @@ def get_gauge_color(aqi):
         return "#8b0000"
 
 
+# table -> deque of (epoch timestamp, local datetime, pm2.5), newest last
+history_cache = {table: deque(maxlen=HISTORY_MAX_POINTS) for table in HISTORY_TABLES}
+history_lock = threading.Lock()
+
+
+def refresh_history_cache():
+    """
+    Append rows newer than the newest cached timestamp to history_cache.
+
+    Only new rows are read (through the (timestamp, pm25) index), so keeping the
+    historical page current costs O(new rows) rather than a 500-row re-query.
+    """
+    with history_lock:
+        for table, pm_column in HISTORY_TABLES.items():
+            cache = history_cache[table]
+            last_seen = cache[-1][0] if cache else 0
+            try:
+                rows = sapphiresdb.get_connection(DB_PATH).execute(
+                    # TEXT timestamps sort above every integer; skip any a pre-migration script wrote
+                    f"SELECT timestamp, {pm_column} FROM {table} WHERE timestamp > ? "
+                    f"AND typeof(timestamp) = 'integer' ORDER BY timestamp DESC LIMIT ?",
+                    (last_seen, HISTORY_MAX_POINTS)
+                ).fetchall()
+            except Exception as e:
+                print(f"Error retrieving historical data from {table}: {e}")
+                continue
+            for timestamp, pm25 in reversed(rows):
+                cache.append((timestamp, datetime.datetime.fromtimestamp(timestamp), pm25))
+
+
+def get_history_since(last_seen):
+    """
+    Return the cached points newer than the client's last seen timestamps.
+
+    Parameters:
+        last_seen (dict): {table: epoch timestamp} as held in the page's store.
+
+    Returns:
+        tuple: ({table: [(timestamp, datetime, pm2.5), ...]}, {table: newest timestamp})
+    """
+    new_points = {}
+    newest = {}
+    with history_lock:
+        for table in HISTORY_TABLES:
+            cutoff = last_seen.get(table, 0)
+            points = []
+            for point in reversed(history_cache[table]):
+                if point[0] <= cutoff:
+                    break
+                points.append(point)
+            points.reverse()
+            new_points[table] = points
+            newest[table] = points[-1][0] if points else cutoff
+    return new_points, newest
+
+
+# Time of the last rollup catch-up done by update_dashboard
+_last_rollup_catch_up = 0
+
+
+def catch_up_rollups():
+    """
+    Fold new Indoor/Outdoor rows into the rollup table, at most once per ROLLUP_CATCH_UP_INTERVAL.
+
+    Errors are logged and retried on the next tick so the gauges still update.
+    """
+    global _last_rollup_catch_up
+    now = time.time()
+    if now - _last_rollup_catch_up < ROLLUP_CATCH_UP_INTERVAL:
+        return
+    _last_rollup_catch_up = now
+    try:
+        rollups.catch_up(DB_PATH, list(HISTORY_TABLES))
+    except Exception as e:
+        print(f"Error updating rollups: {e}")
+        _last_rollup_catch_up = 0
+
+
+def get_pm25_delta(table, current_aqi, latest_timestamp):
+    """
+    Compare the current reading with the mean of the readings 30-60 minutes earlier.
+
+    Parameters:
+        table (str): "Indoor" or "Outdoor".
+        current_aqi (int): Rounded latest PM2.5 reading.
+        latest_timestamp (int): Epoch timestamp of that reading.
+
+    Returns:
+        int: Difference, or 0 when there is no earlier data.
+    """
+    earlier_mean = rollups.get_mean(DB_PATH, table, latest_timestamp - 3600, latest_timestamp - 1800)
+    if earlier_mean is None:
+        return 0
+    return current_aqi - round(earlier_mean)
+
+
 def get_last_fan_state():
     """
     Retrieve the last known fan state from the database.
@@ -179,12 +290,7 @@ def get_last_fan_state():
         str: "ON" or "OFF" (defaults to "OFF" if no data found).
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT user_input FROM user_control ORDER BY id DESC LIMIT 1")
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else "OFF"
+        return sapphiresdb.get_last_user_control(default="OFF", db_path=DB_PATH)
     except Exception as e:
         print(f"Error fetching last fan state: {e}")
         return "OFF"
@@ -199,11 +305,7 @@ def update_fan_state(state):
     """
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('INSERT INTO user_control (timestamp, user_input) VALUES (?, ?)', (timestamp, state))
-        conn.commit()
-        conn.close()
+        sapphiresdb.insert_user_control(state, timestamp=timestamp, db_path=DB_PATH)
     except Exception as e:
         print(f"Error updating fan state to {state}: {e}")
 
@@ -450,48 +552,66 @@ def dashboard_layout():
     ], fluid=True, className="p-4")
 
 
-def historical_conditions_layout():
-    """
-    Constructs the historical conditions layout, showing line charts of indoor and outdoor PM readings.
-    Includes basic error handling and defaults if data is unavailable.
+def fetch_downsampled_history(range_seconds, last_seen):
     """
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        # Limit to last 500 readings
-        indoor_data = pd.read_sql("SELECT timestamp, pm25 FROM Indoor ORDER BY timestamp DESC LIMIT 500;", conn)
-        outdoor_data = pd.read_sql("SELECT timestamp, pm25_value FROM Outdoor ORDER BY timestamp DESC LIMIT 500;", conn)
-        conn.close()
-    except Exception as e:
-        print(f"Error retrieving historical data: {e}")
-        indoor_data = pd.DataFrame(columns=["timestamp", "pm25"])
-        outdoor_data = pd.DataFrame(columns=["timestamp", "pm25_value"])
+    Read a long time range from SQLite and reduce it to HISTORY_POINT_BUDGET points per trace.
 
-    # Convert timestamps and handle empty data gracefully
-    if not indoor_data.empty:
-        indoor_data['timestamp'] = pd.to_datetime(indoor_data['timestamp'])
-    if not outdoor_data.empty:
-        outdoor_data['timestamp'] = pd.to_datetime(outdoor_data['timestamp'])
+    Parameters:
+        range_seconds (int): Length of the range ending at the newest point the client has.
+        last_seen (dict): {table: epoch timestamp} as held in the page's store.
 
-    # Build the figure
+    Returns:
+        dict: {table: (list of datetimes, list of PM2.5 values)}
+    """
+    conn = sapphiresdb.get_connection(DB_PATH)
+    series = {}
+    for table, pm_column in HISTORY_TABLES.items():
+        until = last_seen.get(table) or int(time.time())
+        try:
+            rows = conn.execute(
+                f"SELECT timestamp, {pm_column} FROM {table} WHERE timestamp > ? AND timestamp <= ? "
+                f"ORDER BY timestamp",
+                (until - range_seconds, until)
+            ).fetchall()
+        except Exception as e:
+            print(f"Error retrieving historical data from {table}: {e}")
+            rows = []
+        if not rows:
+            series[table] = ([], [])
+            continue
+        timestamps = np.array([row[0] for row in rows], dtype=float)
+        values = np.array([row[1] for row in rows], dtype=float)
+        timestamps, values = downsample.downsample(timestamps, values, HISTORY_POINT_BUDGET,
+                                                   HISTORY_DOWNSAMPLE_METHOD)
+        series[table] = ([datetime.datetime.fromtimestamp(t) for t in timestamps], values.tolist())
+    return series
+
+
+def make_history_figure(series):
+    """
+    Build the historical line chart.
+
+    Parameters:
+        series (dict): {table: (x values, PM2.5 values)} for every table in HISTORY_TABLES.
+            Both traces are always added so extendData can address them by index.
+    """
     fig = go.Figure()
-    if not indoor_data.empty:
-        fig.add_trace(go.Scatter(
-            x=indoor_data['timestamp'],
-            y=indoor_data['pm25'],
-            mode='lines',
-            name='Indoor PM',
-            line=dict(color='red', width=2, shape='spline'),
-            hoverinfo='x+y',
-        ))
-    if not outdoor_data.empty:
-        fig.add_trace(go.Scatter(
-            x=outdoor_data['timestamp'],
-            y=outdoor_data['pm25_value'],
-            mode='lines',
-            name='Outdoor PM',
-            line=dict(color='blue', width=2, shape='spline'),
-            hoverinfo='x+y',
-        ))
+    fig.add_trace(go.Scatter(
+        x=series["Indoor"][0],
+        y=series["Indoor"][1],
+        mode='lines',
+        name='Indoor PM',
+        line=dict(color='red', width=2, shape='spline'),
+        hoverinfo='x+y',
+    ))
+    fig.add_trace(go.Scatter(
+        x=series["Outdoor"][0],
+        y=series["Outdoor"][1],
+        mode='lines',
+        name='Outdoor PM',
+        line=dict(color='blue', width=2, shape='spline'),
+        hoverinfo='x+y',
+    ))
 
     # Configure layout
     fig.update_layout(
@@ -520,10 +640,36 @@ def historical_conditions_layout():
         height=300,
         margin=dict(l=40, r=40, t=40, b=40)
     )
+    return fig
+
+
+def historical_conditions_layout():
+    """
+    Constructs the historical conditions layout, showing line charts of indoor and outdoor PM readings.
+    The default view is built from the in-memory history cache; newer rows are then
+    appended by extend_historical_graph rather than by rebuilding the figure.
+    Longer ranges picked in the selector are downsampled server-side.
+    """
+    refresh_history_cache()
+    points, last_seen = get_history_since({})
+    fig = make_history_figure({
+        table: ([point[1] for point in points[table]], [point[2] for point in points[table]])
+        for table in HISTORY_TABLES
+    })
 
     return dbc.Container([
         dbc.Row(dbc.Col(html.H1("Historical Conditions", className="text-center mb-4"))),
-        dbc.Row(dbc.Col(dcc.Graph(figure=fig, config={"displayModeBar": False}))),
+        dbc.Row(dbc.Col(dcc.RadioItems(
+            id="history-range",
+            options=[{"label": label, "value": value} for value, (label, _) in HISTORY_RANGES.items()],
+            value="live",
+            inline=True,
+            className="text-center",
+            inputStyle={"margin-left": "15px", "margin-right": "5px"}
+        ))),
+        dbc.Row(dbc.Col(dcc.Graph(id="historical-graph", figure=fig, config={"displayModeBar": False}))),
+        dcc.Store(id="history-last-seen", data=last_seen),
+        dcc.Interval(id="history-interval", interval=HISTORY_REFRESH_INTERVAL, n_intervals=0),
     ], fluid=True, className="p-4")
 
 
@@ -534,6 +680,9 @@ def historical_conditions_layout():
 # Create tables if not exists
 create_tables()
 
+# Load emoji images once; callbacks only reference them by URL
+load_emoji_assets()
+
 app = dash.Dash(
     __name__,
     external_stylesheets=EXTERNAL_STYLESHEETS,
@@ -541,6 +690,21 @@ app = dash.Dash(
     meta_tags=[{"name": "viewport", "content": "width=device-width, initial-scale=1"}]
 )
 
+
+@app.server.route("/emoji/<name>.png")
+def serve_emoji(name):
+    """
+    Serve a cached emoji image. The ?v= query string changes whenever the file
+    does, so the kiosk browser may cache each version indefinitely.
+    """
+    cached = emoji_cache.get(name)
+    if not cached:
+        flask.abort(404)
+    response = flask.Response(cached["data"], mimetype="image/png")
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
 app.layout = html.Div(
     style={"overflow": "hidden", "height": "100vh"},
     children=[
@@ -649,41 +813,35 @@ def update_dashboard(n):
     indoor_delta_text = "0"
     outdoor_delta_text = "0"
 
+    catch_up_rollups()
     try:
-        conn = sqlite3.connect(DB_PATH)
-        # Fetch last 60 indoor/outdoor values; handle empty results
-        indoor_pm = pd.read_sql("SELECT pm25 FROM Indoor ORDER BY timestamp DESC LIMIT 60;", conn)
-        outdoor_pm = pd.read_sql("SELECT pm25_value FROM Outdoor ORDER BY timestamp DESC LIMIT 60;", conn)
-
-        indoor_temp_df = pd.read_sql("SELECT temperature FROM Indoor ORDER BY timestamp DESC LIMIT 1;", conn)
-        outdoor_temp_df = pd.read_sql("SELECT temperature FROM Outdoor ORDER BY timestamp DESC LIMIT 1;", conn)
-        conn.close()
-
-        if not indoor_pm.empty:
-            indoor_aqi = round(indoor_pm['pm25'].iloc[0])
-            if len(indoor_pm) > 30:
-                indoor_delta = indoor_aqi - round(indoor_pm['pm25'].iloc[30:].mean())
-            else:
-                indoor_delta = 0
+        conn = sapphiresdb.get_connection(DB_PATH)
+        # Read only the latest raw row per table plus the pre-aggregated 30-60 minute
+        # window (kept current by catch_up_rollups above)
+        indoor_row = conn.execute(
+            "SELECT timestamp, pm25, temperature FROM Indoor ORDER BY timestamp DESC LIMIT 1;").fetchone()
+        outdoor_row = conn.execute(
+            "SELECT timestamp, pm25_value, temperature FROM Outdoor ORDER BY timestamp DESC LIMIT 1;").fetchone()
+
+        if indoor_row:
+            indoor_aqi = round(indoor_row[1])
+            indoor_delta = get_pm25_delta("Indoor", indoor_aqi, indoor_row[0])
             indoor_delta_text = f"+{indoor_delta}" if indoor_delta > 0 else str(indoor_delta)
             indoor_arrow = "⬆️" if indoor_delta > 0 else "⬇️"
             indoor_arrow_color = "red" if indoor_delta > 0 else "green"
 
-        if not outdoor_pm.empty:
-            outdoor_aqi = round(outdoor_pm['pm25_value'].iloc[0])
-            if len(outdoor_pm) > 30:
-                outdoor_delta = outdoor_aqi - round(outdoor_pm['pm25_value'].iloc[30:].mean())
-            else:
-                outdoor_delta = 0
+        if outdoor_row:
+            outdoor_aqi = round(outdoor_row[1])
+            outdoor_delta = get_pm25_delta("Outdoor", outdoor_aqi, outdoor_row[0])
             outdoor_delta_text = f"+{outdoor_delta}" if outdoor_delta > 0 else str(outdoor_delta)
             outdoor_arrow = "⬆️" if outdoor_delta > 0 else "⬇️"
             outdoor_arrow_color = "red" if outdoor_delta > 0 else "green"
 
-        if not indoor_temp_df.empty:
-            indoor_temp_value = round(indoor_temp_df['temperature'].iloc[0], 1)
+        if indoor_row and indoor_row[2] is not None:
+            indoor_temp_value = round(indoor_row[2], 1)
             indoor_temp_text = f"{indoor_temp_value} °F"
-        if not outdoor_temp_df.empty:
-            outdoor_temp_value = round(outdoor_temp_df['temperature'].iloc[0], 1)
+        if outdoor_row and outdoor_row[2] is not None:
+            outdoor_temp_value = round(outdoor_row[2], 1)
             outdoor_temp_text = f"{outdoor_temp_value} °F"
     except Exception as e:
         print(f"Error retrieving data in update_dashboard: {e}")
@@ -823,6 +981,61 @@ def update_dashboard(n):
     return indoor_gauge, outdoor_gauge, indoor_temp_text, outdoor_temp_text
 
 
+@app.callback(
+    [Output('historical-graph', 'extendData'),
+     Output('history-last-seen', 'data')],
+    [Input('history-interval', 'n_intervals')],
+    [State('history-last-seen', 'data'),
+     State('history-range', 'value')]
+)
+def extend_historical_graph(n, last_seen, range_key):
+    """
+    Streams only the rows newer than the client's last seen timestamps to the
+    historical graph via extendData, trimmed to HISTORY_MAX_POINTS per trace.
+    Only the live view is extended; a downsampled range stays as drawn, and its
+    last seen timestamps are kept so switching back to live resumes from them.
+    """
+    if range_key not in (None, "live"):
+        return dash.no_update, dash.no_update
+    refresh_history_cache()
+    points, newest = get_history_since(last_seen or {})
+    if not any(points.values()):
+        return dash.no_update, dash.no_update
+
+    tables = list(HISTORY_TABLES)
+    extend = {
+        "x": [[point[1] for point in points[table]] for table in tables],
+        "y": [[point[2] for point in points[table]] for table in tables],
+    }
+    return (extend, list(range(len(tables))), HISTORY_MAX_POINTS), newest
+
+
+@app.callback(
+    Output('historical-graph', 'figure'),
+    [Input('history-range', 'value')],
+    [State('history-last-seen', 'data')],
+    prevent_initial_call=True
+)
+def change_history_range(range_key, last_seen):
+    """
+    Rebuilds the historical graph for the selected range. Ranges longer than the
+    live cache are read from SQLite and downsampled to HISTORY_POINT_BUDGET points.
+    The range ends at the client's last seen timestamps so extendData picks up
+    exactly where the new figure stops.
+    """
+    last_seen = last_seen or {}
+    range_seconds = HISTORY_RANGES.get(range_key, HISTORY_RANGES["live"])[1]
+    if range_seconds is None:
+        with history_lock:
+            series = {}
+            for table in HISTORY_TABLES:
+                cached = [point for point in history_cache[table] if point[0] <= last_seen.get(table, 0)]
+                series[table] = ([point[1] for point in cached], [point[2] for point in cached])
+    else:
+        series = fetch_downsampled_history(range_seconds, last_seen)
+    return make_history_figure(series)
+
+
 @app.callback(
     [Output('disable-fan', 'children'),
      Output('disable-fan', 'style'),
@@ -927,5 +1140,9 @@ def manage_fan_workflow(disable_fan_clicks, confirm_yes_clicks, confirm_no_click
 ###################################################
 
 if __name__ == '__main__':
-    # Run app in production mode (for development, use debug=True)
-    app.run_server(debug=False)
+    pending = sapphiresdb.unmigrated_tables(list(HISTORY_TABLES), db_path=DB_PATH)
+    if pending:
+        raise SystemExit(f"{', '.join(pending)} still has TEXT timestamps; run migrateepoch.py {DB_PATH} first")
+    # Run app in production mode (for development, use debug=True).  Requests are
+    # served on one thread so every callback reuses its pooled SQLite connection.
+    app.run_server(debug=False, threaded=False)
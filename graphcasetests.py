@@ -2,6 +2,11 @@ import sqlite3
 import pandas as pd
 import matplotlib.pyplot as plt
 
+import downsample
+
+# Maximum points drawn per line; LTTB keeps spikes while dropping the rest
+PLOT_POINT_BUDGET = 2000
+
 def fetch_data(db_path, table_name):
     # Connect to the SQLite database
     conn = sqlite3.connect(db_path)
@@ -12,6 +17,11 @@ def fetch_data(db_path, table_name):
     conn.close()
     return data
 
+def downsample_for_plot(data):
+    # Reduce a case test to PLOT_POINT_BUDGET points for plotting
+    idx = downsample.lttb_indices(data['timestamp'].astype('int64'), data['pm2_5'], PLOT_POINT_BUDGET)
+    return data.iloc[idx]
+
 # Define paths to your databases and the table name
 db_paths = [
     '/Users/carsenhobson/Downloads/aerosolchambercasetests/air_quality(main case).db',
@@ -33,6 +43,12 @@ data2['timestamp'] = pd.to_datetime(data2['timestamp'])
 data3['timestamp'] = pd.to_datetime(data3['timestamp'])
 data4['timestamp'] = pd.to_datetime(data4['timestamp'])
 
+# Downsample each series so long case tests plot at a fixed point budget
+data1 = downsample_for_plot(data1)
+data2 = downsample_for_plot(data2)
+data3 = downsample_for_plot(data3)
+data4 = downsample_for_plot(data4)
+
 # Plot the data
 plt.figure(figsize=(14, 7))
 
@@ -2,6 +2,11 @@ import sqlite3
 import pandas as pd
 import matplotlib.pyplot as plt
 
+import downsample
+
+# Maximum points drawn per line; LTTB keeps spikes while dropping the rest
+PLOT_POINT_BUDGET = 2000
+
 # Connect to the SQLite database
 db_path = '/Users/carsenhobson/Downloads/detectiontest.db'  # Replace with the actual path to your database
 conn = sqlite3.connect(db_path)
@@ -24,12 +29,15 @@ print(data.head())
 # Convert timestamps to datetime if necessary (assuming 'timestamp' column is present)
 data['timestamp'] = pd.to_datetime(data['timestamp'], unit='s')
 
+# Downsample the line plots so days to months of data draw at a fixed point budget
+plot_data = data.iloc[downsample.lttb_indices(data['timestamp'].astype('int64'), data['pm25'], PLOT_POINT_BUDGET)]
+
 # Plot the data
 plt.figure(figsize=(14, 7))
 
 # Assuming you have columns 'pm25', 'baselinepm25', and 'relaystate' in your data
-plt.plot(data['timestamp'], data['pm25'], label='PM2.5 Levels', color='blue')
-plt.plot(data['timestamp'], data['baselinepm25'], label='Baseline PM2.5 Levels', color='green')
+plt.plot(plot_data['timestamp'], plot_data['pm25'], label='PM2.5 Levels', color='blue')
+plt.plot(plot_data['timestamp'], plot_data['baselinepm25'], label='Baseline PM2.5 Levels', color='green')
 
 # Highlight when relay is ON
 relay_on = data[data['relaystate'] == 'ON']
@@ -0,0 +1,353 @@
+import os
+import csv
+import math
+import time
+import bisect
+import logging
+import importlib
+
+###################################################
+# HARDWARE BACKENDS (REAL OR SIMULATED)
+###################################################
+#
+# Scripts get their sensors and GPIO from here instead of importing
+# RPi.GPIO, sps30, smbus/smbus2 and the BME280 libraries directly:
+#
+#   GPIO = hardware.GPIO                  RPi.GPIO
+#   sps = hardware.SPS30(port=1)          sps30.SPS30
+#   bus = hardware.SMBus(1)               smbus2.SMBus (BME280 via bme280, SDP810)
+#   hardware.bme280                       RPi.bme280 (load_calibration_params/sample)
+#   hardware.Adafruit_BME280              Adafruit_BME280 (BME280(address=...))
+#   hardware.Adafruit_BME280_I2C()        adafruit_bme280.basic on board.I2C()
+#
+# On a Pi nothing changes: the real libraries are imported on first use.
+# With SAPPHIRES_HARDWARE=sim the same names return fakes that read a
+# recorded trace (SAPPHIRES_TRACE=trace.csv) or, without one, a synthetic
+# profile of a clean baseline with a smoke event every SMOKE_PERIOD.
+# Simulated time runs SAPPHIRES_SIM_SPEED times faster than real time;
+# scripts that pace themselves use hardware.now() and hardware.sleep().
+#
+# Trace CSVs have a timestamp column (Unix seconds) and any of pm25,
+# temperature (Celsius), humidity, pressure (hPa) and differential_pressure
+# (Pa); missing columns come from the synthetic profile.  A trace is
+# replayed in a loop.
+
+SIMULATED = os.environ.get("SAPPHIRES_HARDWARE", "").lower() == "sim"
+TRACE_PATH = os.environ.get("SAPPHIRES_TRACE")
+SIM_SPEED = float(os.environ.get("SAPPHIRES_SIM_SPEED", "60"))
+
+# Synthetic profile
+BASELINE_PM25 = 5.0
+SMOKE_PERIOD = 2 * 3600  # Seconds between smoke events
+SMOKE_RISE = 300  # Seconds from start to peak
+SMOKE_PEAK = 80.0  # ug/m3 above baseline
+SMOKE_DECAY = 1200  # Decay time constant in seconds
+# Differential pressure across the filter with the relay (fan) on and off, Pa
+FAN_ON_PRESSURE = 8.0
+FAN_OFF_PRESSURE = 0.2
+
+SDP810_ADDRESS = 0x25
+
+_real_start = time.monotonic()
+_sim_start = time.time()
+_trace = None
+
+
+def now():
+    """Return the current time in seconds; simulated time runs SIM_SPEED times faster."""
+    if not SIMULATED:
+        return time.time()
+    return _sim_start + (time.monotonic() - _real_start) * SIM_SPEED
+
+
+def sleep(seconds):
+    """Sleep for seconds of (possibly simulated) time."""
+    time.sleep(seconds / SIM_SPEED if SIMULATED else seconds)
+
+
+def synthetic_reading(t):
+    """Return the synthetic pm25/temperature/humidity/pressure at Unix time t."""
+    phase = t % SMOKE_PERIOD
+    if phase < SMOKE_RISE:
+        smoke = SMOKE_PEAK * phase / SMOKE_RISE
+    else:
+        smoke = SMOKE_PEAK * math.exp(-(phase - SMOKE_RISE) / SMOKE_DECAY)
+    # Deterministic ripple standing in for sensor noise
+    noise = 0.5 * math.sin(t / 7.0) + 0.3 * math.sin(t / 2.3)
+    day = 2 * math.pi * (t % 86400) / 86400
+    return {
+        "pm25": max(0.0, BASELINE_PM25 + smoke + noise),
+        "temperature": 21.0 + 2.0 * math.sin(day),
+        "humidity": 40.0 - 5.0 * math.sin(day),
+        "pressure": 1013.25 + 0.5 * math.sin(day / 2),
+    }
+
+
+def load_trace(path):
+    """Load a trace CSV into (timestamps, rows), sorted by timestamp."""
+    with open(path, newline="") as f:
+        rows = [
+            {key: float(value) for key, value in row.items() if value not in (None, "")}
+            for row in csv.DictReader(f)
+        ]
+    rows = [row for row in rows if "timestamp" in row]
+    if not rows:
+        raise ValueError(f"Trace {path} has no rows with a timestamp")
+    rows.sort(key=lambda row: row["timestamp"])
+    return [row["timestamp"] for row in rows], rows
+
+
+def reading(t=None):
+    """Return the simulated environment at time t (default now()), from the trace if one is set."""
+    global _trace
+    t = now() if t is None else t
+    values = synthetic_reading(t)
+    if TRACE_PATH:
+        if _trace is None:
+            _trace = load_trace(TRACE_PATH)
+            logging.info(f"Replaying {len(_trace[1])} trace rows from {TRACE_PATH}")
+        timestamps, rows = _trace
+        # The last row lasts one average interval before the trace starts over
+        span = (timestamps[-1] - timestamps[0]) * len(timestamps) / max(1, len(timestamps) - 1)
+        offset = (t - timestamps[0]) % span if span > 0 else 0
+        index = bisect.bisect_right(timestamps, timestamps[0] + offset) - 1
+        values.update(rows[index])
+    return values
+
+
+###################################################
+# FAKE BACKENDS
+###################################################
+
+class SimGPIO:
+    """Stand-in for RPi.GPIO that records pin states."""
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    def __init__(self):
+        self.mode = None
+        self.pins = {}  # pin -> {"direction", "value"}
+        self.switches = 0
+
+    def setwarnings(self, flag):
+        pass
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setup(self, pins, direction, pull_up_down=PUD_OFF, initial=LOW):
+        for pin in pins if isinstance(pins, (list, tuple)) else [pins]:
+            # Pulled-up inputs (e.g. buttons) read HIGH until pressed
+            value = self.HIGH if direction == self.IN and pull_up_down == self.PUD_UP else initial
+            self.pins[pin] = {"direction": direction, "value": value}
+
+    def output(self, pins, values):
+        pins = pins if isinstance(pins, (list, tuple)) else [pins]
+        values = values if isinstance(values, (list, tuple)) else [values] * len(pins)
+        for pin, value in zip(pins, values):
+            state = self.pins.setdefault(pin, {"direction": self.OUT, "value": self.LOW})
+            value = self.HIGH if value else self.LOW
+            if state["value"] != value:
+                self.switches += 1
+                logging.debug(f"GPIO {pin} -> {value}")
+            state["value"] = value
+
+    def input(self, pin):
+        return self.pins.get(pin, {"value": self.LOW})["value"]
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        pass
+
+    def remove_event_detect(self, pin):
+        pass
+
+    def cleanup(self, pins=None):
+        if pins is None:
+            self.pins.clear()
+        else:
+            for pin in pins if isinstance(pins, (list, tuple)) else [pins]:
+                self.pins.pop(pin, None)
+
+    def fan_on(self):
+        """Return True if any output pin (relay) is driven HIGH."""
+        return any(state["direction"] == self.OUT and state["value"] == self.HIGH for state in self.pins.values())
+
+
+class SimSPS30:
+    """Stand-in for sps30.SPS30 reporting the simulated PM2.5."""
+
+    def __init__(self, port=1, *args, **kwargs):
+        self.measuring = False
+        self.dict_values = {}
+
+    def start_measurement(self):
+        self.measuring = True
+
+    def stop_measurement(self):
+        self.measuring = False
+
+    def read_measured_values(self):
+        pm25 = reading()["pm25"]
+        # Mass fractions of a typical smoke size distribution
+        self.dict_values = {
+            "pm1p0": pm25 * 0.9, "pm2p5": pm25, "pm4p0": pm25 * 1.05, "pm10p0": pm25 * 1.1,
+            "nc0p5": pm25 * 6.5, "nc1p0": pm25 * 7.6, "nc2p5": pm25 * 7.7,
+            "nc4p0": pm25 * 7.7, "nc10p0": pm25 * 7.7, "typical": 0.6,
+        }
+
+
+class SimBME280Data:
+    """Result of bme280.sample()."""
+
+    def __init__(self, values):
+        self.timestamp = now()
+        self.temperature = values["temperature"]
+        self.humidity = values["humidity"]
+        self.pressure = values["pressure"]
+
+
+class SimBME280Module:
+    """Stand-in for the RPi.bme280 module."""
+
+    def load_calibration_params(self, bus, address=0x76):
+        return {}
+
+    def sample(self, bus, address=0x76, compensation_params=None):
+        return SimBME280Data(reading())
+
+
+class SimAdafruitBME280:
+    """Stand-in for Adafruit_BME280.BME280 and adafruit_bme280.basic.Adafruit_BME280_I2C."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def read_temperature(self):
+        return reading()["temperature"]
+
+    def read_humidity(self):
+        return reading()["humidity"]
+
+    def read_pressure(self):
+        return reading()["pressure"] * 100  # Pa, like the library
+
+    @property
+    def temperature(self):
+        return self.read_temperature()
+
+    @property
+    def humidity(self):
+        return self.read_humidity()
+
+    @property
+    def pressure(self):
+        return reading()["pressure"]  # hPa, like the library
+
+
+class SimAdafruitBME280Module:
+    """Stand-in for the Adafruit_BME280 module."""
+    BME280 = SimAdafruitBME280
+
+
+class SimSMBus:
+    """Stand-in for smbus/smbus2.SMBus; the SDP810 at 0x25 reports the simulated filter pressure."""
+
+    def __init__(self, bus=1):
+        self.bus = bus
+
+    def write_i2c_block_data(self, address, register, data):
+        pass
+
+    def read_i2c_block_data(self, address, register, length):
+        data = [0] * length
+        if address == SDP810_ADDRESS:
+            values = reading()
+            if "differential_pressure" in values:
+                pressure = values["differential_pressure"]
+            else:
+                # Relay state from the simulated GPIO, if this process drives one
+                gpio = globals().get("GPIO")
+                pressure = FAN_ON_PRESSURE if gpio is not None and gpio.fan_on() else FAN_OFF_PRESSURE
+            # Inverse of the scaling the SDP810 scripts apply to bytes 0 and 1
+            scaled = pressure * 256 / 240
+            if scaled < 0:
+                scaled += 256
+            data[0] = int(scaled) % 256
+            data[1] = min(255, round((scaled - int(scaled)) * 255))
+        return data
+
+    def close(self):
+        pass
+
+
+###################################################
+# BACKEND SELECTION
+###################################################
+
+def SPS30(*args, **kwargs):
+    """Return an sps30.SPS30, or the simulated one."""
+    if SIMULATED:
+        return SimSPS30(*args, **kwargs)
+    return importlib.import_module("sps30").SPS30(*args, **kwargs)
+
+
+def SMBus(bus=1):
+    """Return an smbus2.SMBus (smbus if smbus2 is not installed), or the simulated one."""
+    if SIMULATED:
+        return SimSMBus(bus)
+    try:
+        return importlib.import_module("smbus2").SMBus(bus)
+    except ImportError:
+        return importlib.import_module("smbus").SMBus(bus)
+
+
+def Adafruit_BME280_I2C(address=0x77):
+    """Return an adafruit_bme280 BME280 on board.I2C(), or the simulated one."""
+    if SIMULATED:
+        return SimAdafruitBME280()
+    board = importlib.import_module("board")
+    basic = importlib.import_module("adafruit_bme280.basic")
+    return basic.Adafruit_BME280_I2C(board.I2C(), address=address)
+
+
+_real_modules = {"GPIO": "RPi.GPIO", "bme280": "bme280", "Adafruit_BME280": "Adafruit_BME280"}
+_sim_modules = {"GPIO": SimGPIO, "bme280": SimBME280Module, "Adafruit_BME280": SimAdafruitBME280Module}
+
+
+def __getattr__(name):
+    # hardware.GPIO, hardware.bme280 and hardware.Adafruit_BME280 resolve on first use,
+    # so a node only needs the libraries of the hardware it actually has
+    if name not in _real_modules:
+        raise AttributeError(f"module 'hardware' has no attribute '{name}'")
+    module = _sim_modules[name]() if SIMULATED else importlib.import_module(_real_modules[name])
+    globals()[name] = module
+    return module
+
+
+if __name__ == '__main__':
+    # SAPPHIRES_HARDWARE=sim python hardware.py [hours]: print the simulated profile and read rate
+    import sys
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    start = now()
+    for t in range(int(start), int(start + hours * 3600), 600):
+        values = reading(t)
+        print(time.strftime("%H:%M", time.localtime(t)),
+              " ".join(f"{key}={value:.1f}" for key, value in values.items() if key != "timestamp"))
+
+    sps = SPS30(port=1)
+    reads = 0
+    begin = time.perf_counter()
+    while time.perf_counter() - begin < 1:
+        sps.read_measured_values()
+        reads += 1
+    print(f"{'simulated' if SIMULATED else 'real'} SPS30: {reads} reads/s")
@@ -0,0 +1,196 @@
+import json
+import math
+import zlib
+import struct
+from array import array
+from itertools import accumulate
+
+import sapphiresdb
+
+###################################################
+# INCREMENTAL HUB-TO-LAPTOP TRANSFER
+###################################################
+#
+# The sender (Initiatetransfer.py) keeps a per-table high-water mark of the last
+# rowid it has handed to the broker and only reads rows past it, in
+# CHUNK_ROWS-row chunks using keyset pagination (WHERE rowid > ? LIMIT ?).
+# Every row carries its source rowid so the receiver (Startdatatransfer.py)
+# can insert chunks idempotently: re-sent rows hit its unique source_rowid
+# index and are ignored.
+#
+# Chunks are packed column by column and zlib-compressed:
+#
+#   header   CHUNK_HEADER: magic, version, column count, row count,
+#            chunk id (the rowid the chunk was read after), last rowid, CRC32
+#   types    one typecode byte per column: b"q" int64 stored as deltas from
+#            the previous row, b"d" float64 with NaN for NULL
+#   body     zlib(column 0 bytes + column 1 bytes + ...)
+#
+# Column 0 is the rowid.  Delta-coded rowids and timestamps are runs of
+# identical small numbers, which is what makes the blocks compress so well.
+# The chunk id makes chunks reproducible: re-reading after the same rowid
+# yields the same chunk, so an interrupted transfer resumes from its id.
+
+# Columns sent for each row (after the rowid); the receiver's column1..column5
+TRANSFER_COLUMNS = "timestamp, pm25, temperature, humidity, wifi_strength"
+
+# Rows per published chunk
+CHUNK_ROWS = 5000
+# "columnar" (compressed blocks) or "json" (one JSON array per chunk, for debugging)
+CHUNK_FORMAT = "columnar"
+COMPRESSION_LEVEL = 6
+
+CHUNK_MAGIC = b"SPCH"
+CHUNK_VERSION = 1
+CHUNK_HEADER = struct.Struct("<4sBBIqqI")
+
+WATERMARK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transfer_watermark (
+    table_name TEXT PRIMARY KEY,
+    last_rowid INTEGER
+);
+"""
+
+_initialized = set()
+
+
+def _get_connection(db_path):
+    """Return the pooled connection for db_path, creating the watermark table on first use."""
+    if db_path not in _initialized:
+        sapphiresdb.create_tables(db_path, WATERMARK_SCHEMA)
+        _initialized.add(db_path)
+    return sapphiresdb.get_connection(db_path)
+
+
+def get_watermark(db_path, table_name):
+    """Return the last rowid of table_name already transferred (0 if none)."""
+    row = _get_connection(db_path).execute(
+        "SELECT last_rowid FROM transfer_watermark WHERE table_name = ?", (table_name,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def set_watermark(db_path, table_name, last_rowid):
+    """Advance the high-water mark of table_name to last_rowid."""
+    conn = _get_connection(db_path)
+    with conn:
+        conn.execute(
+            "INSERT INTO transfer_watermark (table_name, last_rowid) VALUES (?, ?) "
+            "ON CONFLICT (table_name) DO UPDATE SET last_rowid = MAX(last_rowid, excluded.last_rowid)",
+            (table_name, last_rowid)
+        )
+
+
+def count_pending(db_path, table_name, after_rowid):
+    """Return the number of rows of table_name past after_rowid."""
+    return _get_connection(db_path).execute(
+        f"SELECT COUNT(*) FROM {table_name} WHERE rowid > ?", (after_rowid,)
+    ).fetchone()[0]
+
+
+def fetch_chunks(db_path, table_name, after_rowid=0, chunk_rows=CHUNK_ROWS):
+    """
+    Yield lists of (rowid, *columns) rows of table_name past after_rowid, oldest first.
+
+    Each chunk is one indexed range scan on the rowid, so the cost of a
+    transfer depends on the new rows only.
+    """
+    conn = _get_connection(db_path)
+    while True:
+        rows = conn.execute(
+            f"SELECT rowid, {TRANSFER_COLUMNS} FROM {table_name} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (after_rowid, chunk_rows)
+        ).fetchall()
+        if not rows:
+            return
+        yield rows
+        after_rowid = rows[-1][0]
+
+
+def encode_chunk(rows, chunk_id=None, chunk_format=None):
+    """
+    Encode a chunk of (rowid, *columns) rows for publishing.
+
+    Parameters:
+        rows (list): Rows from fetch_chunks(); numeric columns only.
+        chunk_id (int): Rowid the chunk was read after; defaults to the first rowid - 1.
+        chunk_format (str): "columnar" or "json"; defaults to CHUNK_FORMAT.
+    """
+    if (chunk_format or CHUNK_FORMAT) == "json":
+        return json.dumps([list(row) for row in rows]).encode("utf-8")
+
+    columns = list(zip(*rows))
+    typecodes = []
+    blocks = []
+    for column in columns:
+        if all(isinstance(value, int) for value in column):
+            typecodes.append("q")
+            blocks.append(array("q", [column[0]] + [b - a for a, b in zip(column, column[1:])]).tobytes())
+        elif all(value is None or isinstance(value, (int, float)) for value in column):
+            typecodes.append("d")
+            blocks.append(array("d", [math.nan if value is None else value for value in column]).tobytes())
+        else:
+            raise ValueError("Columnar chunks only carry numeric columns")
+
+    body = b"".join(blocks)
+    header = CHUNK_HEADER.pack(
+        CHUNK_MAGIC, CHUNK_VERSION, len(columns), len(rows),
+        rows[0][0] - 1 if chunk_id is None else chunk_id, rows[-1][0], zlib.crc32(body)
+    )
+    return header + "".join(typecodes).encode("ascii") + zlib.compress(body, COMPRESSION_LEVEL)
+
+
+def read_chunk_header(payload):
+    """Return (chunk_id, last_rowid, row count) of a columnar chunk, or None for other payloads."""
+    if payload[:len(CHUNK_MAGIC)] != CHUNK_MAGIC or len(payload) < CHUNK_HEADER.size:
+        return None
+    _, _, _, n_rows, chunk_id, last_rowid, _ = CHUNK_HEADER.unpack_from(payload)
+    return chunk_id, last_rowid, n_rows
+
+
+def _decode_columnar(payload):
+    """Unpack and verify a columnar chunk into (rowid, *columns) tuples."""
+    magic, version, n_columns, n_rows, _, _, checksum = CHUNK_HEADER.unpack_from(payload)
+    if version != CHUNK_VERSION:
+        raise ValueError(f"Unsupported chunk version {version}")
+    offset = CHUNK_HEADER.size
+    typecodes = payload[offset:offset + n_columns].decode("ascii")
+    try:
+        body = zlib.decompress(payload[offset + n_columns:])
+    except zlib.error as e:
+        raise ValueError(f"Corrupt chunk: {e}")
+    if zlib.crc32(body) != checksum:
+        raise ValueError("Chunk checksum mismatch")
+
+    columns = []
+    position = 0
+    for typecode in typecodes:
+        values = array(typecode)
+        size = values.itemsize * n_rows
+        values.frombytes(body[position:position + size])
+        position += size
+        if typecode == "q":
+            columns.append(list(accumulate(values)))
+        else:
+            columns.append([None if math.isnan(value) else value for value in values])
+    if position != len(body):
+        raise ValueError("Chunk length does not match its header")
+    return list(zip(*columns))
+
+
+def decode_chunk(payload):
+    """
+    Decode a columnar or JSON chunk into a list of (rowid, *columns) tuples.
+
+    Raises:
+        ValueError: If the payload is not a chunk or fails its checksum.
+    """
+    if payload[:len(CHUNK_MAGIC)] == CHUNK_MAGIC:
+        return _decode_columnar(payload)
+    try:
+        rows = json.loads(payload)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Unrecognised chunk: {e}")
+    if not isinstance(rows, list):
+        raise ValueError("Unrecognised chunk: expected a list of rows")
+    return [tuple(row) for row in rows]
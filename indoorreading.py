@@ -1,8 +1,8 @@
 import time
-from sps30 import SPS30
 import sqlite3
-import board
-from adafruit_bme280 import basic as adafruit_bme280
+
+import hardware
+
 # Database path
 db_path = '/home/mainhubs/SAPPHIRES.db'
 
@@ -13,11 +13,10 @@ conn = sqlite3.connect(db_path)
 cur = conn.cursor()
 
 # Initialize the SPS30 sensor
-sps30 = SPS30(port=1)
+sps30 = hardware.SPS30(port=1)
 
 #Initialize bme280
-i2c = board.I2C()
-bme280 = adafruit_bme280.Adafruit_BME280_I2C(i2c)
+bme280 = hardware.Adafruit_BME280_I2C()
 
 def celsius_to_fahrenheit(celsius):
     return (celsius * 9 / 5) + 32
@@ -29,7 +28,7 @@ try:
     temperature_celsius = bme280.temperature
     temperature_fahrenheit = celsius_to_fahrenheit(temperature_celsius)
     humidity = bme280.humidity
-    current_time = time.strftime('%Y-%m-%d %H:%M:%S')
+    current_time = int(time.time())
 
     # Insert the pm25 value and timestamp into the database
     insert_query = '''
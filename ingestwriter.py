@@ -0,0 +1,198 @@
+import json
+import time
+import queue
+import logging
+import sqlite3
+import threading
+
+import sapphiresdb
+import rollups
+
+###################################################
+# BATCHED MQTT INGEST WRITER
+###################################################
+
+# Flush once this many rows are waiting...
+BATCH_SIZE = 200
+# ...or once the oldest waiting row is this old, whichever comes first
+FLUSH_INTERVAL_MS = 1000
+# Rows held in memory before the overflow policy kicks in
+QUEUE_MAXSIZE = 10000
+# "block": the MQTT thread waits for room (no data loss, broker may back up)
+# "drop_oldest": discard the oldest queued row to make room for the new one
+OVERFLOW_POLICY = "drop_oldest"
+# Flushes of a batch that hit a locked/busy database before it is spilled to disk
+FLUSH_RETRIES = 5
+# Seconds to wait before retrying a failed flush
+RETRY_DELAY = 1
+# Batches that cannot be written are appended here as JSON lines ({db_path} is substituted)
+SPILL_PATH = "{}.spill.jsonl"
+
+_queue = queue.Queue(maxsize=QUEUE_MAXSIZE)
+# Guards the overflow drop in enqueue() and every update of stats
+_overflow_lock = threading.Lock()
+_stop_event = threading.Event()
+_writer_thread = None
+
+stats = {
+    "rows_written": 0,
+    "rows_dropped": 0,
+    "flushes": 0,
+    "last_flush_ms": 0.0,
+    "max_flush_ms": 0.0,
+    "write_errors": 0,
+    "rows_spilled": 0,
+}
+
+
+def enqueue(table_name, row):
+    """
+    Queue one (timestamp, pm25, temperature, humidity, wifi_strength, seq) row for table_name.
+    Safe to call from the paho network thread; never touches the database.
+    """
+    item = (table_name, row)
+    if OVERFLOW_POLICY == "block":
+        _queue.put(item)
+        return
+    with _overflow_lock:
+        try:
+            _queue.put_nowait(item)
+        except queue.Full:
+            try:
+                _queue.get_nowait()
+                stats["rows_dropped"] += 1
+            except queue.Empty:
+                pass
+            _queue.put_nowait(item)
+
+
+def queue_depth():
+    """Return the number of rows waiting to be written."""
+    return _queue.qsize()
+
+
+def get_stats():
+    """Return a snapshot of the writer counters plus the current queue depth."""
+    with _overflow_lock:
+        snapshot = dict(stats)
+    snapshot["queue_depth"] = queue_depth()
+    return snapshot
+
+
+def _spill(db_path, batch, error):
+    """Append a batch that could not be written to the spill file so it can be re-imported."""
+    path = SPILL_PATH.format(db_path)
+    try:
+        with open(path, "a") as f:
+            for table_name, row in batch:
+                f.write(json.dumps({"table": table_name, "row": list(row)}) + "\n")
+        logging.error(f"Spilled {len(batch)} rows to {path} after: {error}")
+    except OSError as e:
+        logging.error(f"Lost {len(batch)} rows ({error}); could not write {path}: {e}")
+    with _overflow_lock:
+        stats["rows_spilled"] += len(batch)
+
+
+def _flush(db_path, batch):
+    """
+    Write batch to db_path in a single transaction, one executemany per table.
+
+    Returns:
+        bool: False if the database was locked or busy and the batch should be retried.
+    """
+    by_table = {}
+    for table_name, row in batch:
+        by_table.setdefault(table_name, []).append(row)
+
+    start = time.perf_counter()
+    written = False
+    retry = False
+    try:
+        conn = sapphiresdb.get_connection(db_path)
+        with conn:
+            for table_name, rows in by_table.items():
+                conn.executemany(sapphiresdb.INSERT_ZEROW.format(table_name), rows)
+            # One last-seen upsert per node instead of scanning the tables later
+            conn.executemany(
+                sapphiresdb.UPSERT_LAST_SEEN,
+                [(table_name, max(row[0] for row in rows)) for table_name, rows in by_table.items()]
+            )
+        written = True
+    except sqlite3.OperationalError as e:
+        # Locked or busy database: keep the rows for the next attempt
+        retry = True
+        logging.error(f"Error flushing {len(batch)} rows to {db_path}, will retry: {e}")
+    except Exception as e:
+        _spill(db_path, batch, e)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    with _overflow_lock:
+        if written:
+            stats["rows_written"] += len(batch)
+        else:
+            stats["write_errors"] += 1
+        stats["flushes"] += 1
+        stats["last_flush_ms"] = elapsed_ms
+        stats["max_flush_ms"] = max(stats["max_flush_ms"], elapsed_ms)
+
+    if written:
+        try:
+            # Keep the per-node rollups current; only the rows just written are read
+            rollups.catch_up(db_path, list(by_table))
+        except Exception as e:
+            logging.error(f"Error updating rollups in {db_path}: {e}")
+    return not retry
+
+
+def _writer_loop(db_path):
+    """Collect rows from the queue and flush every BATCH_SIZE rows or FLUSH_INTERVAL_MS."""
+    interval = FLUSH_INTERVAL_MS / 1000
+    batch = []
+    deadline = None
+    failures = 0
+    while not (_stop_event.is_set() and _queue.empty()):
+        timeout = interval if deadline is None else max(0, deadline - time.monotonic())
+        try:
+            batch.append(_queue.get(timeout=timeout))
+            if deadline is None:
+                deadline = time.monotonic() + interval
+        except queue.Empty:
+            pass
+
+        if batch and (len(batch) >= BATCH_SIZE or time.monotonic() >= deadline or _stop_event.is_set()):
+            if _flush(db_path, batch):
+                failures = 0
+            else:
+                failures += 1
+                if failures < FLUSH_RETRIES:
+                    # Keep the rows and retry them with whatever arrives meanwhile; new rows wait in the queue
+                    time.sleep(RETRY_DELAY)
+                    continue
+                _spill(db_path, batch, f"database still locked after {failures} attempts")
+                failures = 0
+            batch = []
+            deadline = None
+
+    if batch and not _flush(db_path, batch):
+        _spill(db_path, batch, "database locked at shutdown")
+    sapphiresdb.close_connections()
+
+
+def start_writer(db_path):
+    """Start the background writer thread for db_path (no-op if already running)."""
+    global _writer_thread
+    if _writer_thread is not None and _writer_thread.is_alive():
+        return
+    sapphiresdb.create_tables(db_path, sapphiresdb.LIVENESS_SCHEMA)
+    _stop_event.clear()
+    _writer_thread = threading.Thread(target=_writer_loop, args=(db_path,), name="ingest-writer", daemon=True)
+    _writer_thread.start()
+
+
+def stop_writer(timeout=10):
+    """Flush whatever is queued and stop the writer thread."""
+    global _writer_thread
+    if _writer_thread is None:
+        return
+    _stop_event.set()
+    _writer_thread.join(timeout)
+    _writer_thread = None
@@ -0,0 +1,178 @@
+import os
+import json
+
+###################################################
+# INCREMENTAL READERS FOR APPEND-ONLY JSONL LOGS
+###################################################
+#
+# The detection logs (main1.json, sweep.json, ...) are one JSON object per line
+# and only ever appended to.  These helpers avoid re-parsing the whole file:
+#   - read_last_records() seeks back from the end for the trailing N lines
+#   - read_new_records() resumes from a saved byte offset
+#   - read_range() jumps to an hour via a sidecar "<log>.idx" file
+
+BLOCK_SIZE = 4096
+INDEX_SUFFIX = ".idx"
+CHECKPOINT_SUFFIX = ".offset"
+HOUR = 3600
+
+
+def _parse_lines(lines):
+    """Parse complete JSON lines, skipping blank or corrupt ones."""
+    records = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            print(f"Error decoding JSON: {e}")
+    return records
+
+
+def _write_json_atomic(path, data):
+    """Write data as JSON to path via a temp file so readers never see a partial file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def read_last_records(log_file_path, n):
+    """
+    Return the last n records of a JSONL file, oldest first.
+
+    Reads backwards in BLOCK_SIZE chunks until n complete lines are found, so the
+    cost depends on n rather than on the size of the file.
+    """
+    try:
+        with open(log_file_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            buffer = b""
+            # n + 1 newlines guarantee n complete lines (the last line ends in "\n")
+            while position > 0 and buffer.count(b"\n") <= n:
+                read_size = min(BLOCK_SIZE, position)
+                position -= read_size
+                f.seek(position)
+                buffer = f.read(read_size) + buffer
+    except FileNotFoundError:
+        print(f"Error: File not found - {log_file_path}")
+        return []
+
+    # Drop a last line that is still being written
+    lines = buffer[:buffer.rfind(b"\n") + 1].split(b"\n")
+    if position > 0:
+        lines = lines[1:]  # First piece may be the tail of an earlier line
+    records = _parse_lines(lines)
+    return records[-n:] if n else []
+
+
+def read_new_records(log_file_path, checkpoint_path=None):
+    """
+    Return the records appended since the last call and advance the checkpoint.
+
+    The byte offset of the last complete line read is kept in checkpoint_path
+    (default "<log>.offset").  A log that shrank (rotated or truncated) is read
+    from the start again.
+    """
+    checkpoint_path = checkpoint_path or log_file_path + CHECKPOINT_SUFFIX
+    try:
+        with open(checkpoint_path, "r") as f:
+            offset = json.load(f).get("offset", 0)
+    except (FileNotFoundError, json.JSONDecodeError):
+        offset = 0
+
+    try:
+        with open(log_file_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < offset:
+                offset = 0
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return []
+
+    # Leave a partially written last line for the next call
+    end = data.rfind(b"\n") + 1
+    records = _parse_lines(data[:end].split(b"\n"))
+    _write_json_atomic(checkpoint_path, {"offset": offset + end})
+    return records
+
+
+def load_hour_index(log_file_path):
+    """Load the sidecar index: {"offset": bytes indexed, "hours": {hour epoch: byte offset}}."""
+    try:
+        with open(log_file_path + INDEX_SUFFIX, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"offset": 0, "hours": {}}
+
+
+def update_hour_index(log_file_path):
+    """
+    Extend the sidecar index with the byte offset of the first record of each new hour.
+
+    Only the bytes appended since the last update are scanned.
+    """
+    index = load_hour_index(log_file_path)
+    try:
+        with open(log_file_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < index["offset"]:
+                index = {"offset": 0, "hours": {}}
+            f.seek(index["offset"])
+            position = index["offset"]
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    timestamp = int(json.loads(line)["timestamp"])
+                    hour = str(timestamp - timestamp % HOUR)
+                    if hour not in index["hours"]:
+                        index["hours"][hour] = position
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                    pass
+                position += len(line)
+    except FileNotFoundError:
+        return index
+
+    index["offset"] = position
+    _write_json_atomic(log_file_path + INDEX_SUFFIX, index)
+    return index
+
+
+def read_range(log_file_path, start_timestamp, end_timestamp):
+    """
+    Return the records with start_timestamp <= timestamp < end_timestamp.
+
+    Seeks straight to the indexed hour containing start_timestamp and stops at
+    the first record past end_timestamp, so the cost is the size of the range.
+    """
+    index = update_hour_index(log_file_path)
+    start_hour = start_timestamp - start_timestamp % HOUR
+    offset = 0
+    for hour, hour_offset in sorted((int(h), o) for h, o in index["hours"].items()):
+        if hour > start_hour:
+            break
+        offset = hour_offset
+
+    records = []
+    try:
+        with open(log_file_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                parsed = _parse_lines([line])
+                if not parsed:
+                    continue
+                record = parsed[0]
+                timestamp = record.get("timestamp", 0)
+                if timestamp >= end_timestamp:
+                    break
+                if timestamp >= start_timestamp:
+                    records.append(record)
+    except FileNotFoundError:
+        print(f"Error: File not found - {log_file_path}")
+    return records
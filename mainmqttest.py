@@ -1,12 +1,13 @@
 import time
 import os
 import json
-import ast
 import logging
 import secrets
 import string
 import paho.mqtt.client as mqtt
 
+import sensorcodec
+
 # MQTT broker settings (Consider moving these to a configuration file)
 LOCAL_MQTT_BROKER = "10.42.0.1"
 LOCAL_MQTT_PORT = 1883
@@ -68,8 +69,7 @@ def on_message(client, userdata, msg):
     global mqtt_values
 
     try:
-        data_str = msg.payload.decode("utf-8")
-        data_dict = ast.literal_eval(data_str)
+        data_dict = sensorcodec.decode(msg.payload)
         logging.info(f"Received MQTT values: {data_dict}")
 
         if "PM2.5" in data_dict:
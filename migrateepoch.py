@@ -0,0 +1,138 @@
+import sys
+import time
+import sqlite3
+
+import sapphiresdb
+
+###################################################
+# MIGRATE Indoor/Outdoor TO INTEGER EPOCH TIMESTAMPS
+###################################################
+#
+# Rebuilds each table with timestamp INTEGER (epoch seconds) and a covering
+# (timestamp, pm25) index.  Rows are copied in CHUNK_SIZE transactions so the
+# dashboard and ingest keep working during the copy; only the final catch-up
+# and table swap hold the write lock.  An interrupted run resumes from the
+# last copied id.  Usage: python migrateepoch.py [path/to/SAPPHIRES.db]
+
+DB_PATH = sapphiresdb.DB_PATH
+CHUNK_SIZE = 50000
+
+# table name -> (column list with types, pm2.5 column, index name)
+TABLES = {
+    "Indoor": (
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp INTEGER, pm25 REAL, temperature REAL, humidity REAL",
+        "pm25",
+        "idx_indoor_timestamp_pm25",
+    ),
+    "Outdoor": (
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp INTEGER, pm25_value REAL, temperature REAL, "
+        "humidity REAL, wifi_strength REAL",
+        "pm25_value",
+        "idx_outdoor_timestamp_pm25",
+    ),
+}
+
+# Old rows hold local 'YYYY-MM-DD HH:MM:SS' text; the 'utc' modifier converts
+# from local time, so the epoch values match int(time.time()) on the hub.
+EPOCH_EXPRESSION = (
+    "CASE WHEN typeof(timestamp) = 'integer' THEN timestamp "
+    "ELSE CAST(strftime('%s', timestamp, 'utc') AS INTEGER) END"
+)
+
+
+def get_timestamp_type(conn, table_name):
+    """Return the declared type of table_name.timestamp, or None if the table does not exist."""
+    for row in conn.execute(f"PRAGMA table_info({table_name})"):
+        if row[1] == "timestamp":
+            return row[2].upper()
+    return None
+
+
+def table_exists(conn, table_name):
+    """Return True if table_name exists."""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)).fetchone()
+    return row is not None
+
+
+def copy_chunk(conn, table_name, new_table, columns, last_id, limit=None):
+    """Copy rows with id > last_id into new_table, converting timestamps; return the new last id."""
+    other_columns = [c.split()[0] for c in columns.split(",")]
+    other_columns = [c for c in other_columns if c not in ("id", "timestamp")]
+    select_columns = ", ".join(["id", EPOCH_EXPRESSION] + other_columns)
+    insert_columns = ", ".join(["id", "timestamp"] + other_columns)
+    limit_clause = f"LIMIT {int(limit)}" if limit else ""
+    conn.execute(
+        f"INSERT INTO {new_table} ({insert_columns}) "
+        f"SELECT {select_columns} FROM {table_name} WHERE id > ? ORDER BY id {limit_clause}",
+        (last_id,),
+    )
+    row = conn.execute(f"SELECT MAX(id) FROM {new_table}").fetchone()
+    return row[0] if row[0] is not None else last_id
+
+
+def migrate_table(conn, table_name, chunk_size=CHUNK_SIZE):
+    """Convert one table to INTEGER epoch timestamps and build its covering index."""
+    columns, pm_column, index_name = TABLES[table_name]
+    new_table = f"{table_name}__epoch"
+    create_index = f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} (timestamp, {pm_column})"
+
+    declared = get_timestamp_type(conn, table_name)
+    if declared is None:
+        print(f"{table_name} does not exist, skipping.")
+        return
+    if declared == "INTEGER" and not table_exists(conn, new_table):
+        with conn:
+            conn.execute(create_index)
+        print(f"{table_name} already uses INTEGER timestamps.")
+        return
+
+    with conn:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {new_table} ({columns})")
+    last_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {new_table}").fetchone()[0]
+    total = conn.execute(f"SELECT COUNT(*) FROM {table_name} WHERE id > ?", (last_id,)).fetchone()[0]
+    print(f"Migrating {table_name}: {total} rows to copy (resuming after id {last_id}).")
+
+    start = time.time()
+    copied = 0
+    while True:
+        with conn:
+            new_last_id = copy_chunk(conn, table_name, new_table, columns, last_id, chunk_size)
+        if new_last_id == last_id:
+            break
+        copied += conn.execute(
+            f"SELECT COUNT(*) FROM {new_table} WHERE id > ? AND id <= ?", (last_id, new_last_id)
+        ).fetchone()[0]
+        last_id = new_last_id
+        print(f"  {table_name}: {copied}/{total} rows ({time.time() - start:.1f}s)")
+
+    # Catch up rows written during the copy, then swap the tables atomically
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        copy_chunk(conn, table_name, new_table, columns, last_id)
+        conn.execute(f"DROP TABLE {table_name}")
+        conn.execute(f"ALTER TABLE {new_table} RENAME TO {table_name}")
+        conn.execute(create_index)
+        conn.execute("COMMIT")
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+    print(f"{table_name} migrated in {time.time() - start:.1f}s.")
+
+
+def migrate(db_path=DB_PATH, chunk_size=CHUNK_SIZE):
+    """Migrate every table in TABLES and refresh the query planner statistics."""
+    conn = sapphiresdb.get_connection(db_path)
+    for table_name in TABLES:
+        migrate_table(conn, table_name, chunk_size)
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+if __name__ == '__main__':
+    try:
+        migrate(sys.argv[1] if len(sys.argv) > 1 else DB_PATH)
+    except sqlite3.Error as e:
+        print(f"Migration failed: {e}")
+        sys.exit(1)
+    finally:
+        sapphiresdb.close_connections()
@@ -1,15 +1,23 @@
 import time
 import os
-import ast
 import logging
-import sqlite3
 import paho.mqtt.client as mqtt
 
+import sapphiresdb
+import sensorcodec
+import ingestwriter
+
 # MQTT broker settings
 LOCAL_MQTT_BROKER = "10.42.0.1"
 LOCAL_MQTT_PORT = 1883
 LOCAL_MQTT_TOPICS = ["ZeroW1", "ZeroW2", "ZeroW3", "ZeroW4"]
 
+# Node timestamps are accepted from MIN_TIMESTAMP up to MAX_CLOCK_SKEW seconds
+# ahead of the hub.  The Pi Zeros have no RTC, so a node that came back
+# without NTP can report 1970; those readings are rejected and logged.
+MIN_TIMESTAMP = 1704067200  # 2024-01-01 UTC
+MAX_CLOCK_SKEW = 300
+
 # Initialize logging
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s %(levelname)s: %(message)s',
@@ -21,41 +29,48 @@ mqtt_values = {"pm2.5":0, "Temperature (F)":0, "Humidity (%)":0, "Wifi Strength"
 # Database setup
 DATABASE_NAME = "mqtt_data.db"
 TABLES = {
-    "ZeroW1": "CREATE TABLE IF NOT EXISTS ZeroW1 (timestamp INTEGER, pm25 REAL, temperature REAL, humidity REAL, wifi_strength REAL)",
-    "ZeroW2": "CREATE TABLE IF NOT EXISTS ZeroW2 (timestamp INTEGER, pm25 REAL, temperature REAL, humidity REAL, wifi_strength REAL)",
-    "ZeroW3": "CREATE TABLE IF NOT EXISTS ZeroW3 (timestamp INTEGER, pm25 REAL, temperature REAL, humidity REAL, wifi_strength REAL)",
-    "ZeroW4": "CREATE TABLE IF NOT EXISTS ZeroW4 (timestamp INTEGER, pm25 REAL, temperature REAL, humidity REAL, wifi_strength REAL)"
+    "ZeroW1": "CREATE TABLE IF NOT EXISTS ZeroW1 (timestamp INTEGER, pm25 REAL, temperature REAL, humidity REAL, wifi_strength REAL, seq INTEGER)",
+    "ZeroW2": "CREATE TABLE IF NOT EXISTS ZeroW2 (timestamp INTEGER, pm25 REAL, temperature REAL, humidity REAL, wifi_strength REAL, seq INTEGER)",
+    "ZeroW3": "CREATE TABLE IF NOT EXISTS ZeroW3 (timestamp INTEGER, pm25 REAL, temperature REAL, humidity REAL, wifi_strength REAL, seq INTEGER)",
+    "ZeroW4": "CREATE TABLE IF NOT EXISTS ZeroW4 (timestamp INTEGER, pm25 REAL, temperature REAL, humidity REAL, wifi_strength REAL, seq INTEGER)"
 }
 ERROR_LOG_TABLE = "CREATE TABLE IF NOT EXISTS error_log (timestamp INTEGER, error_message TEXT, error_origin TEXT)"
 
 def setup_database():
     """Setup the SQLite database and create tables."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    for table_query in TABLES.values():
-        cursor.execute(table_query)
-    cursor.execute(ERROR_LOG_TABLE)
-    conn.commit()
-    conn.close()
-
-def log_data(data, table_name):
-    """Log data to the specified SQLite table."""
-    current_time = int(time.time())
+    conn = sapphiresdb.get_connection(DATABASE_NAME)
+    with conn:
+        for table_query in TABLES.values():
+            conn.execute(table_query)
+        conn.execute(ERROR_LOG_TABLE)
+    # Older databases: add seq and the replay de-duplication index
+    sapphiresdb.migrate_zerow_tables(DATABASE_NAME, list(TABLES))
+
+def check_timestamp(timestamp, now=None):
+    """Return None if a node timestamp is plausible, otherwise the reason it is rejected."""
+    now = time.time() if now is None else now
+    if timestamp < MIN_TIMESTAMP:
+        return f"timestamp {timestamp} is before {MIN_TIMESTAMP} (node clock not set?)"
+    if timestamp > now + MAX_CLOCK_SKEW:
+        return f"timestamp {timestamp} is {timestamp - now:.0f}s in the future"
+    return None
+
+def log_data(data, table_name, timestamp=None, seq=None):
+    """
+    Queue data for the specified SQLite table; the ingest writer commits it in batches.
+    timestamp is the time the node took the reading (replayed readings arrive late);
+    seq lets the database ignore a reading that is delivered twice.
+    """
+    current_time = int(time.time()) if timestamp is None else int(timestamp)
     entry_with_timestamp = (
         current_time,
         data.get("pm2.5", 0),
         data.get("temperature", 0),
         data.get("humidity", 0),
         data.get("Wifi Strength", 0),
+        seq,
     )
-    try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute(f"INSERT INTO {table_name} (timestamp, pm25, temperature, humidity, wifi_strength) VALUES (?, ?, ?, ?, ?)", entry_with_timestamp)
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        logging.error(f"Error writing to database table {table_name}: {e}")
+    ingestwriter.enqueue(table_name, entry_with_timestamp)
 
 def on_subscribe(client, userdata, mid, reason_code_list, properties):
     """Handle MQTT subscription acknowledgment."""
@@ -74,8 +89,7 @@ def on_message(client, userdata, msg):
     global mqtt_values
 
     try:
-        data_str = msg.payload.decode("utf-8")
-        data_dict = ast.literal_eval(data_str)
+        data_dict = sensorcodec.decode(msg.payload)
         logging.info(f"Received MQTT values: {data_dict}")
 
         if "PM2.5" in data_dict:
@@ -90,7 +104,12 @@ def on_message(client, userdata, msg):
 
         table_name = msg.topic
         if table_name in TABLES:
-            log_data(mqtt_values, table_name)
+            timestamp = data_dict.get("timestamp")
+            reason = check_timestamp(timestamp) if timestamp is not None else None
+            if reason:
+                log_error(f"Rejected reading {data_dict.get('seq')} from {table_name}: {reason}", "Raspberry Pi Zero Ws")
+                return
+            log_data(mqtt_values, table_name, timestamp, data_dict.get("seq"))
 
     except Exception as e:
         error_message = f"Error processing MQTT message: {e}"
@@ -101,17 +120,14 @@ def log_error(error_message, error_origin):
     current_time = int(time.time())
     error_entry = (current_time, error_message, error_origin)
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO error_log (timestamp, error_message, error_origin) VALUES (?, ?, ?)", error_entry)
-        conn.commit()
-        conn.close()
+        sapphiresdb.insert_error_log(error_entry, DATABASE_NAME)
     except Exception as e:
         logging.error(f"Error writing to error log database: {e}")
 
 def main():
     """Main function to run the MQTT client."""
     setup_database()
+    ingestwriter.start_writer(DATABASE_NAME)
 
     local_mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
     local_mqtt_client.on_connect = on_connect
@@ -127,6 +143,8 @@ def main():
     finally:
         local_mqtt_client.loop_stop()
         local_mqtt_client.disconnect()
+        ingestwriter.stop_writer()
+        logging.info(f"Ingest writer stats: {ingestwriter.get_stats()}")
 
 if __name__ == "__main__":
     main()
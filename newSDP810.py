@@ -1,7 +1,8 @@
-import smbus
 import time
 import logging
 
+import hardware
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s]: Data=%(message)s, Unix Time=%(unix_time)s",
@@ -14,15 +15,15 @@ def log_data_value(data_value):
     unix_time = int(time.time())
     logging.info(data_value, extra={"unix_time": unix_time})
 
-bus = smbus.SMBus(1)
+bus = hardware.SMBus(1)
 address = 0x25
 bus.write_i2c_block_data(address, 0x3F, [0xF9])
-time.sleep(0.8)
+hardware.sleep(0.8)
 
 bus.write_i2c_block_data(address, 0x36, [0x03])
 
 while True:
-    time.sleep(0.5)  # Adjust sleep time as needed for fastest possible reading
+    hardware.sleep(0.5)  # Adjust sleep time as needed for fastest possible reading
     reading = bus.read_i2c_block_data(address, 0, 9)
     pressure_value = reading[0] + float(reading[1]) / 255
     if pressure_value >= 0 and pressure_value < 128:
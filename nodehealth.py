@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import socket
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+###################################################
+# BACKGROUND NODE REACHABILITY PROBES
+###################################################
+#
+# Probes every node listed in nodes.json concurrently on a background thread
+# and keeps the latest result per node, so dashboards read a dict instead of
+# waiting on ping.  nodes.json maps node name -> {"ip": ..., "reset_topic": ...}.
+
+NODES_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nodes.json")
+
+# Seconds between probe rounds
+PROBE_INTERVAL = 10
+# Seconds before a single probe counts as failed
+PROBE_TIMEOUT = 1
+# "ping" (ICMP via the ping binary) or "tcp" (connect to PROBE_TCP_PORT)
+PROBE_METHOD = "ping"
+PROBE_TCP_PORT = 22
+MAX_WORKERS = 32
+
+_status = {}
+_status_lock = threading.Lock()
+# Node list the running prober was started with
+_nodes = {}
+_stop_event = threading.Event()
+_probe_thread = None
+
+
+def load_nodes(config_path=NODES_CONFIG_PATH):
+    """Return {node name: {"ip": ..., "reset_topic": ...}} from the nodes config file."""
+    with open(config_path, "r") as f:
+        return json.load(f)
+
+
+def probe_ping(ip, timeout=PROBE_TIMEOUT):
+    """Return True if ip answers one ICMP echo within timeout seconds."""
+    try:
+        result = subprocess.run(
+            ["ping", "-c", "1", "-W", str(max(1, int(timeout))), ip],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout + 1
+        )
+        return result.returncode == 0
+    except (subprocess.TimeoutExpired, OSError):
+        return False
+
+
+def probe_tcp(ip, timeout=PROBE_TIMEOUT, port=PROBE_TCP_PORT):
+    """Return True if a TCP connection to ip:port opens within timeout seconds."""
+    try:
+        with socket.create_connection((ip, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def _probe_node(ip):
+    """Probe one node with PROBE_METHOD; return (reachable, latency in ms)."""
+    probe = probe_tcp if PROBE_METHOD == "tcp" else probe_ping
+    start = time.perf_counter()
+    reachable = probe(ip)
+    return reachable, (time.perf_counter() - start) * 1000
+
+
+def probe_all(nodes, executor):
+    """Probe every node concurrently and store the results."""
+    futures = {name: executor.submit(_probe_node, node["ip"]) for name, node in nodes.items()}
+    checked = time.time()
+    results = {}
+    for name, future in futures.items():
+        try:
+            reachable, latency_ms = future.result()
+        except Exception as e:
+            logging.error(f"Error probing {name}: {e}")
+            reachable, latency_ms = False, None
+        results[name] = {
+            "status": "Connected" if reachable else "Disconnected",
+            "latency_ms": latency_ms,
+            "checked": checked,
+        }
+    with _status_lock:
+        _status.clear()
+        _status.update(results)
+    return results
+
+
+def _probe_loop(nodes):
+    """Probe nodes every PROBE_INTERVAL seconds."""
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="node-probe") as executor:
+        while not _stop_event.is_set():
+            probe_all(nodes, executor)
+            _stop_event.wait(PROBE_INTERVAL)
+
+
+def start_prober(nodes=None, config_path=NODES_CONFIG_PATH):
+    """
+    Start the background probe thread (no-op if already running).
+
+    Parameters:
+        nodes (dict): Node list to probe; loaded once from config_path if not given.
+    """
+    global _probe_thread, _nodes
+    if _probe_thread is not None and _probe_thread.is_alive():
+        return
+    _nodes = dict(nodes) if nodes is not None else load_nodes(config_path)
+    _stop_event.clear()
+    _probe_thread = threading.Thread(target=_probe_loop, args=(_nodes,), name="node-prober", daemon=True)
+    _probe_thread.start()
+
+
+def stop_prober(timeout=5):
+    """Stop the background probe thread."""
+    global _probe_thread
+    if _probe_thread is None:
+        return
+    _stop_event.set()
+    _probe_thread.join(timeout)
+    _probe_thread = None
+
+
+def get_status():
+    """Return a snapshot of {node name: {"status", "latency_ms", "checked"}} from the last round."""
+    with _status_lock:
+        return {name: dict(result) for name, result in _status.items()}
+
+
+def get_device_status():
+    """Return {node name: "Connected" / "Disconnected" / "Unknown"} for every configured node."""
+    status = get_status()
+    return {name: status.get(name, {}).get("status", "Unknown") for name in _nodes or status}
@@ -0,0 +1,517 @@
+import os
+import re
+import sys
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    from pyarrow import feather
+except ImportError:
+    # Without pyarrow read_readings() parses the CSV every time (pip install pyarrow)
+    feather = None
+
+###################################################
+# SHARED STAGES FOR THE PURPLEAIR INDOOR/OUTDOOR SCRIPTS
+###################################################
+
+PM25_COLUMN = 'PM2.5_CF1_ug/m3'
+TIMESTAMP_COLUMN = 'created_at'
+# A reading is elevated when it exceeds its sensor's mean by this many ug/m3
+ELEVATION_MARGIN = 5
+
+# Classification codes written to the 'classification' column
+NEITHER_ELEVATED = 1
+INDOOR_ELEVATED = 2
+OUTDOOR_ELEVATED = 3
+BOTH_ELEVATED = 4
+
+# Largest clock offset between paired indoor/outdoor readings, and which
+# outdoor reading to pair with: "nearest", "backward" (at or before) or "forward"
+ALIGN_TOLERANCE_SECONDS = 60
+ALIGN_DIRECTION = "nearest"
+
+# Sorted int64 nanosecond key added to each side for merge_asof
+_ALIGN_KEY = '_aligned_ns'
+
+# Export file names start with "<sensor id>_<YYYY-MM-DD>", e.g. "123456_2024-05-01.csv"
+# or "123456_2024-05-01_2024-05-31.csv"; adjust to match the download tool in use
+FILENAME_PATTERN = re.compile(r'^(?P<sensor>[^_]+)_(?P<date>\d{4}-\d{2}-\d{2})')
+# Indoor sensor id -> outdoor sensor id it is compared against
+SENSOR_PAIRS = {}
+
+# A gap in the samples longer than this ends a spike event
+EVENT_MAX_GAP_SECONDS = 600
+# Integrated exposure is reported in ug/m3 x hours
+EXPOSURE_UNIT_SECONDS = 3600
+
+# Columns the scripts use, and the dtypes they are cached with
+READING_COLUMNS = [TIMESTAMP_COLUMN, PM25_COLUMN, 'entry_id']
+READING_DTYPES = {PM25_COLUMN: 'float64', 'entry_id': 'Int64'}
+# Folder (next to the CSVs unless given) holding one uncompressed Feather file per
+# distinct CSV content, named by its hash; uncompressed so it can be memory-mapped
+CACHE_FOLDER_NAME = '.purpleair_cache'
+CACHE_VERSION = 1
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def timestamps_ns(created_at):
+    """Convert a created_at column (strings or datetimes) to int64 UTC nanoseconds."""
+    if not pd.api.types.is_datetime64_any_dtype(created_at):
+        # PurpleAir writes "YYYY-MM-DD HH:MM:SS UTC"; without the suffix pandas takes its fast ISO path
+        created_at = created_at.astype(str).str.removesuffix(' UTC')
+    return pd.to_datetime(created_at, utc=True).dt.as_unit('ns').astype('int64')
+
+
+def _keyed(data):
+    """Return data with the int64 alignment key, sorted on it only if it is not already."""
+    data = data.assign(**{_ALIGN_KEY: timestamps_ns(data[TIMESTAMP_COLUMN]).to_numpy()})
+    if not data[_ALIGN_KEY].is_monotonic_increasing:
+        data = data.sort_values(_ALIGN_KEY, kind='stable')
+    return data
+
+
+def align(indoor_data, outdoor_data, tolerance_seconds=ALIGN_TOLERANCE_SECONDS, direction=ALIGN_DIRECTION):
+    """
+    Pair every indoor reading with the outdoor reading closest in time.
+
+    Unlike an exact merge on created_at, readings whose clocks differ by a few
+    seconds still pair up.  Indoor readings with no outdoor reading within
+    tolerance_seconds (in the given direction) are dropped.
+
+    Returns:
+        DataFrame: Columns suffixed _indoor/_outdoor as before, with 'created_at'
+        holding the indoor timestamp and 'created_at_outdoor' the paired one.
+    """
+    indoor = _keyed(indoor_data).add_suffix('_indoor').rename(columns={f'{_ALIGN_KEY}_indoor': _ALIGN_KEY})
+    outdoor = _keyed(outdoor_data).add_suffix('_outdoor').rename(columns={f'{_ALIGN_KEY}_outdoor': _ALIGN_KEY})
+    outdoor['_matched'] = True
+
+    merged_data = pd.merge_asof(
+        indoor, outdoor, on=_ALIGN_KEY,
+        tolerance=int(tolerance_seconds * 1_000_000_000), direction=direction
+    )
+    merged_data = merged_data[merged_data['_matched'].eq(True)]
+    return (merged_data
+            .drop(columns=[_ALIGN_KEY, '_matched'])
+            .rename(columns={f'{TIMESTAMP_COLUMN}_indoor': TIMESTAMP_COLUMN})
+            .reset_index(drop=True))
+
+
+def classify(indoor_pm25, outdoor_pm25, indoor_threshold, outdoor_threshold):
+    """
+    Classify paired indoor/outdoor PM2.5 readings in one vectorized pass.
+
+    Returns an int8 array: 4 both elevated, 2 only indoor, 3 only outdoor,
+    1 neither.  NaN readings count as not elevated, as the old row-by-row
+    comparison did.
+    """
+    indoor_elevated = np.asarray(indoor_pm25, dtype=float) > indoor_threshold
+    outdoor_elevated = np.asarray(outdoor_pm25, dtype=float) > outdoor_threshold
+    return np.select(
+        [indoor_elevated & outdoor_elevated, indoor_elevated, outdoor_elevated],
+        [BOTH_ELEVATED, INDOOR_ELEVATED, OUTDOOR_ELEVATED],
+        default=NEITHER_ELEVATED
+    ).astype(np.int8)
+
+
+def classify_merged(merged_data, indoor_mean, outdoor_mean, margin=ELEVATION_MARGIN):
+    """Return the classification of every row of a merged indoor/outdoor frame."""
+    return classify(
+        merged_data[f'{PM25_COLUMN}_indoor'].to_numpy(),
+        merged_data[f'{PM25_COLUMN}_outdoor'].to_numpy(),
+        indoor_mean + margin,
+        outdoor_mean + margin,
+    )
+
+
+def segment_events(created_at, above, values, max_gap_seconds=EVENT_MAX_GAP_SECONDS):
+    """
+    Split time-ordered samples into events: runs of consecutive above-threshold samples.
+
+    Each sample stands for the time until the next one (the typical sampling
+    interval where that gap exceeds max_gap_seconds, which also ends the event),
+    so an event lasts from its first sample to the sample after its last, and
+    its exposure is the sum of value x interval.  Runs are found with one
+    run-length pass and summed with reduceat, so the cost is linear in samples.
+
+    Parameters:
+        created_at (Series): Sample times, strings or datetimes, ascending.
+        above (array): Boolean, True where the sample is part of a spike.
+        values (dict): Name -> values array; each gets peak_<name> and exposure_<name>.
+
+    Returns:
+        DataFrame: One row per event with start, end, duration, samples and the
+        peak and integrated exposure of every value, in time order.
+    """
+    times = timestamps_ns(pd.Series(created_at)).to_numpy()
+    above = np.asarray(above, dtype=bool)
+    max_gap = int(max_gap_seconds * 1_000_000_000)
+
+    gaps = np.diff(times)
+    within = gaps[gaps <= max_gap]
+    typical = int(np.median(within)) if len(within) else 0
+    intervals = np.empty(len(times), dtype=np.int64)
+    intervals[:-1] = np.where(gaps > max_gap, typical, gaps)
+    intervals[-1:] = typical
+
+    # An event starts at an above-threshold sample whose predecessor is below it or too far back
+    breaks = np.ones(len(times), dtype=bool)
+    breaks[1:] = ~above[:-1] | (gaps > max_gap)
+    members = np.flatnonzero(above)
+    offsets = np.searchsorted(members, np.flatnonzero(above & breaks))
+    last = members[np.append(offsets[1:], len(members)) - 1] if len(members) else members
+
+    start = times[members[offsets]]
+    end = times[last] + intervals[last]
+    events = {
+        'start': pd.to_datetime(start, utc=True),
+        'end': pd.to_datetime(end, utc=True),
+        'duration': pd.to_timedelta(end - start),
+        'samples': np.diff(np.append(offsets, len(members))),
+    }
+    weights = intervals[members] / (EXPOSURE_UNIT_SECONDS * 1_000_000_000)
+    for name, column in values.items():
+        column = np.asarray(column, dtype=float)[members]
+        events[f'peak_{name}'] = np.maximum.reduceat(column, offsets) if len(offsets) else column
+        events[f'exposure_{name}'] = np.add.reduceat(column * weights, offsets) if len(offsets) else column
+    return pd.DataFrame(events)
+
+
+def file_hash(path):
+    """Return the BLAKE2b hex digest of a file's contents."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_readings(csv_path):
+    """Parse the READING_COLUMNS of a PurpleAir CSV with fixed dtypes and a UTC created_at."""
+    data = pd.read_csv(csv_path, usecols=READING_COLUMNS, dtype=READING_DTYPES)
+    data[TIMESTAMP_COLUMN] = pd.to_datetime(timestamps_ns(data[TIMESTAMP_COLUMN]), utc=True)
+    return data
+
+
+def cache_path(csv_path, cache_folder=None):
+    """Return the Feather cache file for csv_path's current contents."""
+    if cache_folder is None:
+        cache_folder = os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_FOLDER_NAME)
+    return os.path.join(cache_folder, f'{file_hash(csv_path)}.v{CACHE_VERSION}.feather')
+
+
+def read_readings(csv_path, cache_folder=None, columns=None):
+    """
+    Return the readings of a PurpleAir CSV, converting it to the Feather cache once.
+
+    The cache is keyed by content hash, so a re-downloaded or edited export is
+    converted again while renamed or copied files reuse their entry.  Cached
+    files are memory-mapped and only the requested columns are read.
+
+    Parameters:
+        cache_folder (str): Defaults to CACHE_FOLDER_NAME next to the CSV.
+        columns (list): Subset of READING_COLUMNS; defaults to all of them.
+    """
+    columns = columns or READING_COLUMNS
+    if feather is None:
+        return parse_readings(csv_path)[columns]
+
+    path = cache_path(csv_path, cache_folder)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Concurrent workers may convert the same file; each writes its own temp file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            feather.write_feather(parse_readings(csv_path), tmp_path, compression='uncompressed')
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def parse_filename(file_name):
+    """Return (sensor id, date string) parsed with FILENAME_PATTERN, or None if it does not match."""
+    match = FILENAME_PATTERN.match(file_name)
+    if match is None:
+        return None
+    return match.group('sensor'), match.group('date')
+
+
+def pair_files(input_folder, sensor_pairs=None):
+    """
+    Pair indoor and outdoor exports in input_folder by sensor id and date.
+
+    Parameters:
+        sensor_pairs (dict): Indoor sensor id -> outdoor sensor id; defaults to SENSOR_PAIRS.
+
+    Returns:
+        list: (indoor file name, outdoor file name) tuples, sorted by date then sensor.
+
+    Raises:
+        ValueError: If no sensor pairs are configured, or if two exports share a
+            sensor id and start date (e.g. a daily and a monthly download).
+    """
+    sensor_pairs = SENSOR_PAIRS if sensor_pairs is None else sensor_pairs
+    if not sensor_pairs:
+        raise ValueError("No sensor pairs configured; set SENSOR_PAIRS or pass --pair INDOOR:OUTDOOR")
+    files = {}
+    collisions = []
+    for file_name in sorted(os.listdir(input_folder)):
+        if not file_name.endswith('.csv'):
+            continue
+        parsed = parse_filename(file_name)
+        if parsed is None:
+            print(f"Skipping {file_name}: name does not match {FILENAME_PATTERN.pattern}")
+            continue
+        if parsed in files:
+            collisions.append(f"{files[parsed]} and {file_name} (sensor {parsed[0]}, {parsed[1]})")
+            continue
+        files[parsed] = file_name
+    if collisions:
+        raise ValueError("Ambiguous exports, move one of each out of the input folder: " + "; ".join(collisions))
+
+    pairs = []
+    for (sensor, date), file_name in sorted(files.items(), key=lambda item: (item[0][1], item[0][0])):
+        outdoor_sensor = sensor_pairs.get(sensor)
+        if outdoor_sensor is None:
+            continue
+        outdoor_file = files.get((outdoor_sensor, date))
+        if outdoor_file is None:
+            print(f"No outdoor export from sensor {outdoor_sensor} for {file_name}")
+            continue
+        pairs.append((file_name, outdoor_file))
+    return pairs
+
+
+def is_up_to_date(output_path, input_paths):
+    """Return True if output_path exists and is newer than every input."""
+    try:
+        output_mtime = os.path.getmtime(output_path)
+    except OSError:
+        return False
+    return all(os.path.getmtime(path) <= output_mtime for path in input_paths)
+
+
+def write_csv_atomic(data, output_path, **kwargs):
+    """Write data to output_path via a temp file so an interrupted run never leaves a partial CSV."""
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        data.to_csv(tmp_path, **kwargs)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def run_batch(process_pair, output_name, input_folder, output_folder, sensor_pairs=None, workers=None, force=False):
+    """
+    Run process_pair(indoor_path, outdoor_path, output_path) over every file pair in parallel.
+
+    Parameters:
+        process_pair (callable): Module-level function (it is pickled to the worker processes).
+        output_name (callable): (indoor file, outdoor file) -> output file name.
+        workers (int): Worker processes; defaults to the number of cores.
+        force (bool): Reprocess pairs whose output is already newer than its inputs.
+
+    Returns:
+        dict: Counts of "processed", "skipped" and "failed" pairs.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    jobs = []
+    skipped = 0
+    for indoor_file, outdoor_file in pair_files(input_folder, sensor_pairs):
+        indoor_path = os.path.join(input_folder, indoor_file)
+        outdoor_path = os.path.join(input_folder, outdoor_file)
+        output_path = os.path.join(output_folder, output_name(indoor_file, outdoor_file))
+        if not force and is_up_to_date(output_path, [indoor_path, outdoor_path]):
+            skipped += 1
+            continue
+        jobs.append((indoor_path, outdoor_path, output_path))
+
+    counts = {"processed": 0, "skipped": skipped, "failed": 0}
+    if not jobs:
+        print(f"Nothing to process ({skipped} pairs up to date)")
+        return counts
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_pair, *job): job for job in jobs}
+        for future in as_completed(futures):
+            indoor_path, outdoor_path, output_path = futures[future]
+            try:
+                future.result()
+                counts["processed"] += 1
+            except Exception as e:
+                counts["failed"] += 1
+                print(f"Error processing {os.path.basename(indoor_path)} / {os.path.basename(outdoor_path)}: {e}")
+    print(f"Processed {counts['processed']} pairs ({counts['skipped']} up to date, {counts['failed']} failed) "
+          f"in {time.perf_counter() - start:.1f}s")
+    return counts
+
+
+def batch_main(process_pair, output_name, input_folder, output_folder):
+    """Command line entry point shared by the PurpleAir scripts."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Process paired indoor/outdoor PurpleAir exports")
+    parser.add_argument("--input", default=input_folder, help="folder of exported CSVs")
+    parser.add_argument("--output", default=output_folder, help="folder for the results")
+    parser.add_argument("--pair", action="append", metavar="INDOOR:OUTDOOR",
+                        help="indoor and outdoor sensor ids to compare (repeatable; default SENSOR_PAIRS)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--force", action="store_true", help="reprocess pairs whose output is up to date")
+    args = parser.parse_args()
+
+    sensor_pairs = dict(pair.split(":", 1) for pair in args.pair) if args.pair else None
+    try:
+        counts = run_batch(process_pair, output_name, args.input, args.output,
+                           sensor_pairs=sensor_pairs, workers=args.workers, force=args.force)
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+    if counts["failed"]:
+        sys.exit(1)
+    return counts
+
+
+def benchmark_classify(n_rows=2_000_000, apply_rows=200_000):
+    """
+    Time classify() against the old DataFrame.apply(classify, axis=1) on synthetic readings.
+
+    apply() is timed on apply_rows rows and scaled up, since running it on
+    millions of rows takes minutes.
+    """
+    rng = np.random.default_rng(0)
+    merged_data = pd.DataFrame({
+        f'{PM25_COLUMN}_indoor': rng.gamma(2.0, 4.0, n_rows),
+        f'{PM25_COLUMN}_outdoor': rng.gamma(2.0, 5.0, n_rows),
+    })
+    indoor_mean = merged_data[f'{PM25_COLUMN}_indoor'].mean()
+    outdoor_mean = merged_data[f'{PM25_COLUMN}_outdoor'].mean()
+
+    start = time.perf_counter()
+    vectorized = classify_merged(merged_data, indoor_mean, outdoor_mean)
+    vectorized_seconds = time.perf_counter() - start
+
+    def classify_row(row):
+        indoor_pm25 = row[f'{PM25_COLUMN}_indoor']
+        outdoor_pm25 = row[f'{PM25_COLUMN}_outdoor']
+        if indoor_pm25 > indoor_mean + ELEVATION_MARGIN and outdoor_pm25 > outdoor_mean + ELEVATION_MARGIN:
+            return BOTH_ELEVATED
+        elif indoor_pm25 > indoor_mean + ELEVATION_MARGIN:
+            return INDOOR_ELEVATED
+        elif outdoor_pm25 > outdoor_mean + ELEVATION_MARGIN:
+            return OUTDOOR_ELEVATED
+        return NEITHER_ELEVATED
+
+    sample = merged_data.iloc[:apply_rows]
+    start = time.perf_counter()
+    by_row = sample.apply(classify_row, axis=1).to_numpy()
+    apply_seconds = (time.perf_counter() - start) * n_rows / len(sample)
+
+    assert (by_row == vectorized[:len(sample)]).all()
+    print(f"{n_rows} rows: np.select {vectorized_seconds:.3f}s, "
+          f"apply ~{apply_seconds:.1f}s (scaled from {len(sample)} rows), "
+          f"{apply_seconds / vectorized_seconds:.0f}x faster")
+
+
+def benchmark_align(days=90, interval_seconds=120, max_offset_seconds=20):
+    """
+    Compare align() with the old exact merge on a synthetic multi-month export pair.
+
+    The outdoor sensor's clock drifts up to max_offset_seconds from the indoor
+    one, as two PurpleAir units do in practice.
+    """
+    rng = np.random.default_rng(0)
+    n_rows = days * 86400 // interval_seconds
+    start = pd.Timestamp('2024-01-01', tz='UTC')
+    indoor_times = start + pd.to_timedelta(np.arange(n_rows) * interval_seconds, unit='s')
+    offsets = pd.to_timedelta(rng.integers(-max_offset_seconds, max_offset_seconds + 1, n_rows), unit='s')
+    indoor_data = pd.DataFrame({
+        'created_at': indoor_times.strftime('%Y-%m-%d %H:%M:%S UTC'),
+        'entry_id': np.arange(n_rows),
+        PM25_COLUMN: rng.gamma(2.0, 4.0, n_rows),
+    })
+    outdoor_data = pd.DataFrame({
+        'created_at': (indoor_times + offsets).strftime('%Y-%m-%d %H:%M:%S UTC'),
+        'entry_id': np.arange(n_rows),
+        PM25_COLUMN: rng.gamma(2.0, 5.0, n_rows),
+    })
+
+    exact = indoor_data.merge(outdoor_data, on='created_at', suffixes=('_indoor', '_outdoor'))
+    begin = time.perf_counter()
+    aligned = align(indoor_data, outdoor_data)
+    seconds = time.perf_counter() - begin
+    paired_correctly = (aligned['entry_id_indoor'] == aligned['entry_id_outdoor']).mean()
+    print(f"{days} days, {n_rows} rows per sensor: exact merge kept {len(exact)} rows, "
+          f"align kept {len(aligned)} ({paired_correctly:.1%} paired with their true partner) in {seconds:.2f}s")
+
+
+def benchmark_events(n_rows=20_000_000, interval_seconds=120):
+    """Time segment_events() on n_rows samples of a synthetic series with smoke spikes."""
+    rng = np.random.default_rng(0)
+    times = pd.Series(pd.Timestamp('2024-01-01', tz='UTC')
+                      + pd.to_timedelta(np.arange(n_rows) * interval_seconds, unit='s'))
+    # Background with occasional decaying spikes
+    pm25 = rng.gamma(2.0, 4.0, n_rows)
+    spikes = rng.random(n_rows) < 0.002
+    pm25[spikes] += rng.gamma(4.0, 50.0, spikes.sum())
+    pm25 = pd.Series(pm25).ewm(alpha=0.2).mean().to_numpy()
+
+    begin = time.perf_counter()
+    events = segment_events(times, pm25 > pm25.mean() + ELEVATION_MARGIN, {'pm25': pm25})
+    seconds = time.perf_counter() - begin
+    print(f"{n_rows} samples: {len(events)} events, median {events['duration'].median()}, in {seconds:.2f}s")
+
+
+def benchmark_read(days=365, interval_seconds=120, repeats=3):
+    """Compare pd.read_csv + pd.to_datetime with read_readings() on a synthetic export."""
+    import tempfile
+    rng = np.random.default_rng(0)
+    n_rows = days * 86400 // interval_seconds
+    times = pd.Timestamp('2024-01-01', tz='UTC') + pd.to_timedelta(np.arange(n_rows) * interval_seconds, unit='s')
+    export = pd.DataFrame({
+        'created_at': times.strftime('%Y-%m-%d %H:%M:%S UTC'),
+        'entry_id': np.arange(n_rows),
+        PM25_COLUMN: rng.gamma(2.0, 4.0, n_rows),
+        'Temperature_F': rng.normal(70, 5, n_rows),
+        'Humidity_%': rng.normal(40, 10, n_rows),
+    })
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = os.path.join(folder, 'bench_2024-01-01.csv')
+        export.to_csv(csv_path, index=False)
+
+        begin = time.perf_counter()
+        for _ in range(repeats):
+            data = pd.read_csv(csv_path)
+            data['created_at'] = pd.to_datetime(data['created_at'])
+        csv_seconds = (time.perf_counter() - begin) / repeats
+
+        begin = time.perf_counter()
+        read_readings(csv_path)
+        first_seconds = time.perf_counter() - begin
+        begin = time.perf_counter()
+        for _ in range(repeats):
+            read_readings(csv_path)
+        cached_seconds = (time.perf_counter() - begin) / repeats
+
+    backend = "Feather cache" if feather is not None else "typed CSV parse (pyarrow not installed)"
+    print(f"{n_rows} rows: read_csv + to_datetime {csv_seconds:.2f}s, first read_readings {first_seconds:.2f}s, "
+          f"later read_readings {cached_seconds:.3f}s via {backend}")
+
+
+if __name__ == '__main__':
+    # python purpleair.py classify [rows]   benchmark the classification stage
+    # python purpleair.py align [days]      benchmark indoor/outdoor alignment
+    # python purpleair.py read [days]       benchmark CSV parsing against the Feather cache
+    # python purpleair.py events [rows]     benchmark spike-event segmentation
+    stage = sys.argv[1] if len(sys.argv) > 1 else "classify"
+    if stage == "events":
+        benchmark_events(int(sys.argv[2]) if len(sys.argv) > 2 else 20_000_000)
+    elif stage == "read":
+        benchmark_read(int(sys.argv[2]) if len(sys.argv) > 2 else 365)
+    elif stage == "align":
+        benchmark_align(int(sys.argv[2]) if len(sys.argv) > 2 else 90)
+    else:
+        benchmark_classify(int(sys.argv[2]) if len(sys.argv) > 2 else 2_000_000)
@@ -0,0 +1,171 @@
+import time
+import sqlite3
+
+import sapphiresdb
+
+###################################################
+# LONG-RUNNING RISING-EDGE DETECTOR
+###################################################
+#
+# Replaces the once-a-minute filtertestalgo.py / detectiontestV2db.py runs.
+# The last WINDOW_SIZE Indoor readings live in a fixed-size ring buffer and
+# two running counters track how many of them are above THRESHOLD x baseline
+# and how many are at or below baseline, so each new sample is an O(1) update
+# and the ON/OFF decision is a pair of integer comparisons.
+
+DB_PATH = sapphiresdb.DB_PATH
+WINDOW_SIZE = 20  # Number of readings to consider
+THRESHOLD = 1.25  # Turn ON when every reading is above THRESHOLD x baseline
+MAX_SAMPLE_AGE = 3600  # Every reading in the window must be newer than this (seconds)
+MIN_BASELINE = 7.5  # Baseline floor, also used when no baseline is stored
+POLL_INTERVAL = 5  # Seconds between checks for new Indoor rows
+BASELINE_REFRESH = 300  # Seconds between baseline re-reads
+STATE_HEARTBEAT = 60  # Re-record the current state this often so "ON in the last hour" checks still work
+
+# Rows with a TEXT timestamp (written by a script that predates migrateepoch.py) are skipped
+SELECT_NEW_INDOOR = "SELECT id, timestamp, pm25 FROM Indoor WHERE id > ? AND typeof(timestamp) = 'integer' ORDER BY id"
+SELECT_LAST_INDOOR = "SELECT id, timestamp, pm25 FROM Indoor WHERE typeof(timestamp) = 'integer' ORDER BY id DESC LIMIT ?"
+
+# Ring buffer
+pm25_values = [0.0] * WINDOW_SIZE
+timestamp_values = [0] * WINDOW_SIZE
+head = 0  # Index the next sample is written to (and of the oldest sample once full)
+count = 0
+
+# Running counters over the samples currently in the window
+count_above_threshold = 0
+count_at_or_below_baseline = 0
+
+baseline_pm25 = MIN_BASELINE
+current_relay_state = 'OFF'
+
+
+def _classify(value):
+    """Return (above threshold, at or below baseline) flags for one reading."""
+    return value > THRESHOLD * baseline_pm25, value <= baseline_pm25
+
+
+def push_sample(pm25, timestamp):
+    """Add one reading to the ring buffer, evicting the oldest, in O(1)."""
+    global head, count, count_above_threshold, count_at_or_below_baseline
+
+    if count == WINDOW_SIZE:
+        old_above, old_below = _classify(pm25_values[head])
+        count_above_threshold -= old_above
+        count_at_or_below_baseline -= old_below
+    else:
+        count += 1
+
+    pm25_values[head] = pm25
+    timestamp_values[head] = timestamp
+    new_above, new_below = _classify(pm25)
+    count_above_threshold += new_above
+    count_at_or_below_baseline += new_below
+    head = (head + 1) % WINDOW_SIZE
+
+
+def set_baseline(value):
+    """Change the baseline and rebuild the counters (O(WINDOW_SIZE), only on change)."""
+    global baseline_pm25, count_above_threshold, count_at_or_below_baseline
+
+    value = max(value if value is not None else MIN_BASELINE, MIN_BASELINE)
+    if value == baseline_pm25:
+        return
+    baseline_pm25 = value
+    count_above_threshold = 0
+    count_at_or_below_baseline = 0
+    for i in range(count):
+        above, below = _classify(pm25_values[(head - count + i) % WINDOW_SIZE])
+        count_above_threshold += above
+        count_at_or_below_baseline += below
+
+
+def oldest_timestamp():
+    """Return the timestamp of the oldest reading in the window."""
+    return timestamp_values[head] if count == WINDOW_SIZE else timestamp_values[0]
+
+
+def evaluate(now=None):
+    """
+    Apply the rising-edge rule to the current window and return the new relay state.
+
+    Same hysteresis as filtertestalgo.check_rising_edge: OFF -> ON when every
+    reading is above THRESHOLD x baseline, ON -> OFF when every reading is at or
+    below baseline, and no change until the window is full and fresh.
+    """
+    global current_relay_state
+
+    now = time.time() if now is None else now
+    if count < WINDOW_SIZE or oldest_timestamp() < now - MAX_SAMPLE_AGE:
+        return current_relay_state
+
+    if current_relay_state == 'OFF' and count_above_threshold == WINDOW_SIZE:
+        current_relay_state = 'ON'
+        print("PM2.5 is above threshold. Relay turned ON.")
+    elif current_relay_state == 'ON' and count_at_or_below_baseline == WINDOW_SIZE:
+        current_relay_state = 'OFF'
+        print("PM2.5 is at or below baseline. Relay turned OFF.")
+    return current_relay_state
+
+
+def record_state(state):
+    """Insert the relay state into the filter_state table."""
+    try:
+        sapphiresdb.insert_filter_state(state, db_path=DB_PATH)
+    except sqlite3.Error as e:
+        print(f"Error inserting data into filter_state table: {str(e)}")
+
+
+def prime_window(conn):
+    """Fill the ring buffer with the most recent readings; return the last Indoor id seen."""
+    rows = conn.execute(SELECT_LAST_INDOOR, (WINDOW_SIZE,)).fetchall()
+    for _, timestamp, pm25 in reversed(rows):
+        push_sample(pm25, timestamp)
+    return rows[0][0] if rows else 0
+
+
+def run():
+    """Poll for new Indoor rows forever, updating the window and filter_state as they arrive."""
+    global current_relay_state
+
+    sapphiresdb.create_tables(DB_PATH)
+    pending = sapphiresdb.unmigrated_tables(["Indoor"], db_path=DB_PATH)
+    if pending:
+        raise SystemExit(f"{', '.join(pending)} still has TEXT timestamps; run migrateepoch.py {DB_PATH} first")
+    conn = sapphiresdb.get_connection(DB_PATH)
+    current_relay_state = sapphiresdb.get_last_filter_state(default='OFF', db_path=DB_PATH)
+    print(f"Initial relay state: {current_relay_state}")
+
+    set_baseline(sapphiresdb.get_last_baseline(db_path=DB_PATH))
+    last_id = prime_window(conn)
+    last_baseline_read = time.time()
+    last_recorded = 0
+
+    while True:
+        try:
+            now = time.time()
+            if now - last_baseline_read >= BASELINE_REFRESH:
+                set_baseline(sapphiresdb.get_last_baseline(db_path=DB_PATH))
+                last_baseline_read = now
+
+            previous_state = current_relay_state
+            for row_id, timestamp, pm25 in conn.execute(SELECT_NEW_INDOOR, (last_id,)).fetchall():
+                push_sample(pm25, timestamp)
+                last_id = row_id
+                evaluate(now)
+
+            if current_relay_state != previous_state or now - last_recorded >= STATE_HEARTBEAT:
+                record_state(current_relay_state)
+                last_recorded = now
+        except sqlite3.Error as e:
+            print(f"Database error in detector loop: {str(e)}")
+        time.sleep(POLL_INTERVAL)
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except KeyboardInterrupt:
+        print("\nKeyboard interrupt detected. Detector stopped.")
+    finally:
+        sapphiresdb.close_connections()
@@ -0,0 +1,190 @@
+import sys
+import time
+import sqlite3
+
+import sapphiresdb
+
+###################################################
+# PRE-AGGREGATED PM2.5 / TEMPERATURE ROLLUPS
+###################################################
+#
+# Keeps min/sum/max/count per sensor per 1-minute, 15-minute and hourly bucket
+# in a "rollup" table next to the raw data, so dashboards and baseline jobs
+# read a handful of rows instead of raw samples.  catch_up() folds in the raw
+# rows added since the rowid stored in "rollup_checkpoint".  Each chunk reads
+# the checkpoint, folds the rows and advances it inside one BEGIN IMMEDIATE
+# transaction, so concurrent callers (the ingest writer, this script's loop)
+# serialize on the write lock and never fold the same rows twice.  The
+# dashboard keeps Indoor/Outdoor current itself (throttled catch_up); run this
+# script as well to roll up the ZeroW and pm25_data tables.
+#
+# Usage: python rollups.py [db_path ...]   (catch-up loop, ROLLUP_INTERVAL seconds)
+
+RESOLUTIONS = [60, 900, 3600]  # Bucket widths in seconds
+CATCH_UP_CHUNK = 50000  # Raw rows folded in per transaction
+ROLLUP_INTERVAL = 60  # Seconds between catch-up passes when run as a script
+
+# Raw rows written as local 'YYYY-MM-DD HH:MM:SS' text
+TEXT_EPOCH = "CAST(strftime('%s', timestamp, 'utc') AS INTEGER)"
+
+# source -> (timestamp expression, pm2.5 column, temperature column or None)
+SOURCES = {
+    "Indoor": ("timestamp", "pm25", "temperature"),
+    "Outdoor": ("timestamp", "pm25_value", "temperature"),
+    "ZeroW1": ("timestamp", "pm25", "temperature"),
+    "ZeroW2": ("timestamp", "pm25", "temperature"),
+    "ZeroW3": ("timestamp", "pm25", "temperature"),
+    "ZeroW4": ("timestamp", "pm25", "temperature"),
+    "pm25_data": (TEXT_EPOCH, "pm25_value", None),
+}
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup (
+    source TEXT,
+    resolution INTEGER,
+    bucket INTEGER,
+    count INTEGER,
+    pm25_min REAL,
+    pm25_max REAL,
+    pm25_sum REAL,
+    temperature_min REAL,
+    temperature_max REAL,
+    temperature_sum REAL,
+    PRIMARY KEY (source, resolution, bucket)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rollup_checkpoint (
+    source TEXT PRIMARY KEY,
+    last_rowid INTEGER
+);
+"""
+
+UPSERT_TEMPLATE = """
+INSERT INTO rollup (source, resolution, bucket, count, pm25_min, pm25_max, pm25_sum,
+                    temperature_min, temperature_max, temperature_sum)
+SELECT ?, ?, (ts / ?) * ?, COUNT(*), MIN(pm), MAX(pm), SUM(pm), MIN(temp), MAX(temp), SUM(temp)
+FROM (SELECT {timestamp} AS ts, {pm25} AS pm, {temperature} AS temp
+      FROM {table} WHERE rowid > ? AND rowid <= ?)
+WHERE ts IS NOT NULL
+GROUP BY 3
+ON CONFLICT (source, resolution, bucket) DO UPDATE SET
+    count = count + excluded.count,
+    pm25_min = MIN(pm25_min, excluded.pm25_min),
+    pm25_max = MAX(pm25_max, excluded.pm25_max),
+    pm25_sum = pm25_sum + excluded.pm25_sum,
+    temperature_min = MIN(temperature_min, excluded.temperature_min),
+    temperature_max = MAX(temperature_max, excluded.temperature_max),
+    temperature_sum = temperature_sum + excluded.temperature_sum
+"""
+
+# Database paths whose rollup tables have been created by this process
+_initialized = set()
+
+
+def _ensure_tables(db_path):
+    """Create the rollup tables in db_path once per process."""
+    if db_path not in _initialized:
+        sapphiresdb.create_tables(db_path, ROLLUP_SCHEMA)
+        _initialized.add(db_path)
+
+
+def _table_exists(conn, table_name):
+    """Return True if table_name exists."""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)).fetchone()
+    return row is not None
+
+
+def catch_up(db_path, sources=None):
+    """
+    Fold raw rows added since the last checkpoint into the rollup table.
+
+    Parameters:
+        db_path (str): Database holding both the raw tables and the rollups.
+        sources (list): Source tables to process; defaults to every SOURCES entry present.
+
+    Returns:
+        int: Number of raw rows folded in.
+    """
+    _ensure_tables(db_path)
+    conn = sapphiresdb.get_connection(db_path)
+    folded = 0
+    for source in sources or SOURCES:
+        if not _table_exists(conn, source):
+            continue
+        timestamp, pm25, temperature = SOURCES[source]
+        upsert = UPSERT_TEMPLATE.format(timestamp=timestamp, pm25=pm25,
+                                        temperature=temperature or "NULL", table=source)
+
+        while True:
+            with conn:
+                # Take the write lock before reading the checkpoint so no other
+                # caller can fold the same rowid range in the meantime
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT last_rowid FROM rollup_checkpoint WHERE source = ?", (source,)).fetchone()
+                last_rowid = row[0] if row else 0
+                max_rowid = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {source}").fetchone()[0]
+                if last_rowid >= max_rowid:
+                    break
+                upper = min(last_rowid + CATCH_UP_CHUNK, max_rowid)
+                for resolution in RESOLUTIONS:
+                    conn.execute(upsert, (source, resolution, resolution, resolution, last_rowid, upper))
+                conn.execute(
+                    "INSERT OR REPLACE INTO rollup_checkpoint (source, last_rowid) VALUES (?, ?)",
+                    (source, upper)
+                )
+            folded += upper - last_rowid
+    return folded
+
+
+def get_buckets(db_path, source, resolution, start, end):
+    """
+    Return the buckets of one source in [start, end) as dicts, oldest first.
+
+    Each dict has bucket, count, pm25_min/mean/max and temperature_min/mean/max.
+    """
+    _ensure_tables(db_path)
+    rows = sapphiresdb.get_connection(db_path).execute(
+        "SELECT bucket, count, pm25_min, pm25_sum / count, pm25_max, "
+        "temperature_min, temperature_sum / count, temperature_max "
+        "FROM rollup WHERE source = ? AND resolution = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+        (source, resolution, start, end)
+    ).fetchall()
+    keys = ("bucket", "count", "pm25_min", "pm25_mean", "pm25_max",
+            "temperature_min", "temperature_mean", "temperature_max")
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def get_mean(db_path, source, start, end, column="pm25", resolution=60):
+    """
+    Return the mean of column ("pm25" or "temperature") over [start, end), or None if no data.
+
+    Weighted by bucket counts, so it equals the mean of the raw samples.
+    """
+    _ensure_tables(db_path)
+    row = sapphiresdb.get_connection(db_path).execute(
+        f"SELECT SUM({column}_sum), SUM(count) FROM rollup "
+        f"WHERE source = ? AND resolution = ? AND bucket >= ? AND bucket < ?",
+        (source, resolution, start, end)
+    ).fetchone()
+    if not row or not row[1] or row[0] is None:
+        return None
+    return row[0] / row[1]
+
+
+if __name__ == '__main__':
+    db_paths = sys.argv[1:] or [sapphiresdb.DB_PATH]
+    try:
+        while True:
+            for db_path in db_paths:
+                try:
+                    start = time.time()
+                    folded = catch_up(db_path)
+                    if folded:
+                        print(f"Rolled up {folded} rows in {db_path} ({time.time() - start:.2f}s)")
+                except sqlite3.Error as e:
+                    print(f"Error rolling up {db_path}: {e}")
+            time.sleep(ROLLUP_INTERVAL)
+    except KeyboardInterrupt:
+        print("\nKeyboard interrupt detected. Rollup job stopped.")
+    finally:
+        sapphiresdb.close_connections()
@@ -0,0 +1,292 @@
+import sqlite3
+import threading
+import datetime
+import time
+
+###################################################
+# SHARED SQLITE ACCESS FOR SAPPHIRES.db / mqtt_data.db
+###################################################
+
+# Default database used by the main hub dashboard and control scripts
+DB_PATH = '/home/mainhubs/SAPPHIRES.db'
+
+# Number of compiled statements each connection keeps around.  sqlite3 caches
+# prepared statements by SQL text, so reusing the constants below on a pooled
+# connection skips the parse/compile step after the first call.
+STATEMENT_CACHE_SIZE = 128
+
+# Seconds to wait on a locked database before raising
+BUSY_TIMEOUT = 10
+
+SAPPHIRES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS Indoor (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp INTEGER,
+    pm25 REAL,
+    temperature REAL,
+    humidity REAL
+);
+
+CREATE TABLE IF NOT EXISTS baseline (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    baseline_value REAL
+);
+
+CREATE TABLE IF NOT EXISTS user_control (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    user_input TEXT
+);
+
+CREATE TABLE IF NOT EXISTS filter_state (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    filter_state TEXT
+);
+
+CREATE TABLE IF NOT EXISTS Outdoor (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp INTEGER,
+    pm25_value REAL,
+    temperature REAL,
+    humidity REAL,
+    wifi_strength REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_indoor_timestamp_pm25 ON Indoor (timestamp, pm25);
+CREATE INDEX IF NOT EXISTS idx_outdoor_timestamp_pm25 ON Outdoor (timestamp, pm25_value);
+CREATE INDEX IF NOT EXISTS idx_filter_state_timestamp ON filter_state (timestamp);
+"""
+
+# Node liveness: last_seen is updated by the ingest writer on every flush,
+# reboot_log records each reboot the liveness watcher requests
+LIVENESS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS last_seen (node TEXT PRIMARY KEY, timestamp INTEGER);
+CREATE TABLE IF NOT EXISTS reboot_log (node TEXT, timestamp INTEGER);
+CREATE INDEX IF NOT EXISTS idx_reboot_log_node_timestamp ON reboot_log (node, timestamp);
+"""
+
+# seq is the node's message sequence number (NULL for legacy senders); see migrate_zerow_tables()
+MQTT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ZeroW1 (timestamp INTEGER, pm25 REAL, temperature REAL, humidity REAL, wifi_strength REAL, seq INTEGER);
+CREATE TABLE IF NOT EXISTS ZeroW2 (timestamp INTEGER, pm25 REAL, temperature REAL, humidity REAL, wifi_strength REAL, seq INTEGER);
+CREATE TABLE IF NOT EXISTS ZeroW3 (timestamp INTEGER, pm25 REAL, temperature REAL, humidity REAL, wifi_strength REAL, seq INTEGER);
+CREATE TABLE IF NOT EXISTS ZeroW4 (timestamp INTEGER, pm25 REAL, temperature REAL, humidity REAL, wifi_strength REAL, seq INTEGER);
+CREATE INDEX IF NOT EXISTS idx_zerow1_timestamp ON ZeroW1 (timestamp);
+CREATE INDEX IF NOT EXISTS idx_zerow2_timestamp ON ZeroW2 (timestamp);
+CREATE INDEX IF NOT EXISTS idx_zerow3_timestamp ON ZeroW3 (timestamp);
+CREATE INDEX IF NOT EXISTS idx_zerow4_timestamp ON ZeroW4 (timestamp);
+CREATE TABLE IF NOT EXISTS error_log (timestamp INTEGER, error_message TEXT, error_origin TEXT);
+""" + LIVENESS_SCHEMA
+
+# Prepared statements for the SAPPHIRES.db tables
+INSERT_INDOOR = "INSERT INTO Indoor (timestamp, pm25, temperature, humidity) VALUES (?, ?, ?, ?)"
+INSERT_OUTDOOR = "INSERT INTO Outdoor (timestamp, pm25_value, temperature, humidity, wifi_strength) VALUES (?, ?, ?, ?, ?)"
+INSERT_FILTER_STATE = "INSERT INTO filter_state (timestamp, filter_state) VALUES (?, ?)"
+INSERT_USER_CONTROL = "INSERT INTO user_control (timestamp, user_input) VALUES (?, ?)"
+INSERT_BASELINE = "INSERT INTO baseline (timestamp, baseline_value) VALUES (?, ?)"
+
+SELECT_LAST_USER_CONTROL = "SELECT user_input FROM user_control ORDER BY id DESC LIMIT 1"
+SELECT_LAST_FILTER_STATE = "SELECT filter_state FROM filter_state ORDER BY id DESC LIMIT 1"
+SELECT_LAST_BASELINE = "SELECT baseline_value FROM baseline ORDER BY id DESC LIMIT 1"
+
+# Prepared statements for the mqtt_data.db tables
+# A reading replayed after a lost PUBACK has the same (seq, timestamp) and is ignored
+INSERT_ZEROW = (
+    "INSERT OR IGNORE INTO {} (timestamp, pm25, temperature, humidity, wifi_strength, seq) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+ZEROW_TABLES = ["ZeroW1", "ZeroW2", "ZeroW3", "ZeroW4"]
+INSERT_ERROR_LOG = "INSERT INTO error_log (timestamp, error_message, error_origin) VALUES (?, ?, ?)"
+UPSERT_LAST_SEEN = (
+    "INSERT INTO last_seen (node, timestamp) VALUES (?, ?) "
+    "ON CONFLICT (node) DO UPDATE SET timestamp = MAX(timestamp, excluded.timestamp)"
+)
+SELECT_LAST_SEEN = "SELECT node, timestamp FROM last_seen"
+INSERT_REBOOT_LOG = "INSERT INTO reboot_log (node, timestamp) VALUES (?, ?)"
+
+# One dict of {db_path: connection} per thread
+_local = threading.local()
+
+
+def _open_connection(db_path):
+    """Open a new connection to db_path and apply the shared PRAGMAs."""
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, cached_statements=STATEMENT_CACHE_SIZE)
+    # WAL lets the dashboard read while ingest writes, and with synchronous=NORMAL
+    # a commit no longer fsyncs the main database file every time.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def get_connection(db_path=DB_PATH):
+    """
+    Return this thread's pooled connection to db_path, opening it on first use.
+
+    Connections stay open for the life of the thread so the page cache and the
+    prepared statement cache survive between dashboard ticks and MQTT messages.
+    Dash apps must run with threaded=False: the threaded dev server starts a
+    new thread per request, which would open a new connection every tick.
+    Callers must not close the returned connection; use close_connections().
+    """
+    pool = getattr(_local, "connections", None)
+    if pool is None:
+        pool = _local.connections = {}
+    conn = pool.get(db_path)
+    if conn is None:
+        conn = pool[db_path] = _open_connection(db_path)
+    return conn
+
+
+def close_connections():
+    """Close every pooled connection held by the calling thread."""
+    pool = getattr(_local, "connections", None)
+    if not pool:
+        return
+    for conn in pool.values():
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error closing database connection: {e}")
+    pool.clear()
+
+
+def create_tables(db_path=DB_PATH, schema=SAPPHIRES_SCHEMA):
+    """
+    Create the tables in schema if they do not exist.
+    Called once at start-up by every script that owns a database.
+    """
+    conn = get_connection(db_path)
+    with conn:
+        conn.executescript(schema)
+
+
+def unmigrated_tables(tables=("Indoor", "Outdoor"), db_path=DB_PATH):
+    """
+    Return the tables that still hold TEXT timestamps and need migrateepoch.py.
+
+    Checks the declared column type, then the highest-sorting timestamp: SQLite
+    orders TEXT after INTEGER, so one index lookup finds any leftover text row.
+    """
+    conn = get_connection(db_path)
+    pending = []
+    for table in tables:
+        declared = [row[2].upper() for row in conn.execute(f"PRAGMA table_info({table})") if row[1] == "timestamp"]
+        if not declared:
+            continue
+        if declared[0] != "INTEGER":
+            pending.append(table)
+            continue
+        row = conn.execute(f"SELECT typeof(timestamp) FROM {table} ORDER BY timestamp DESC LIMIT 1").fetchone()
+        if row is not None and row[0] == "text":
+            pending.append(table)
+    return pending
+
+
+def migrate_zerow_tables(db_path, tables=ZEROW_TABLES):
+    """
+    Add the seq column, the (seq, timestamp) unique index and the timestamp index
+    (for the dashboard's latest-reading and Wi-Fi average queries) to existing ZeroW tables.
+
+    The index includes the timestamp so a node whose spool (and sequence
+    counter) was wiped does not have its new readings ignored as duplicates.
+    """
+    conn = get_connection(db_path)
+    with conn:
+        for table in tables:
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+            if not columns:
+                continue
+            if "seq" not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN seq INTEGER")
+            conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table.lower()}_seq ON {table} (seq, timestamp)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table.lower()}_timestamp ON {table} (timestamp)")
+
+
+def now_string():
+    """Return the current local time in the TEXT timestamp format used by the control tables."""
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def now_epoch():
+    """Return the current time as integer epoch seconds, the timestamp format of Indoor/Outdoor."""
+    return int(time.time())
+
+
+def execute_write(sql, params, db_path=DB_PATH):
+    """Run a single INSERT/UPDATE on the pooled connection and commit it."""
+    conn = get_connection(db_path)
+    with conn:
+        conn.execute(sql, params)
+
+
+def fetch_one_value(sql, params=(), default=None, db_path=DB_PATH):
+    """Run a query on the pooled connection and return the first column of the first row."""
+    row = get_connection(db_path).execute(sql, params).fetchone()
+    return row[0] if row else default
+
+
+def insert_indoor(pm25, temperature, humidity, timestamp=None, db_path=DB_PATH):
+    """Insert one Indoor reading; timestamp is integer epoch seconds."""
+    execute_write(INSERT_INDOOR, (timestamp or now_epoch(), pm25, temperature, humidity), db_path)
+
+
+def insert_outdoor(pm25_value, temperature, humidity, wifi_strength, timestamp=None, db_path=DB_PATH):
+    """Insert one Outdoor reading; timestamp is integer epoch seconds."""
+    execute_write(INSERT_OUTDOOR, (timestamp or now_epoch(), pm25_value, temperature, humidity, wifi_strength), db_path)
+
+
+def insert_filter_state(state, timestamp=None, db_path=DB_PATH):
+    """Record a filter_state ("ON"/"OFF")."""
+    execute_write(INSERT_FILTER_STATE, (timestamp or now_string(), state), db_path)
+
+
+def insert_user_control(user_input, timestamp=None, db_path=DB_PATH):
+    """Record a user_control input ("ON"/"OFF")."""
+    execute_write(INSERT_USER_CONTROL, (timestamp or now_string(), user_input), db_path)
+
+
+def insert_baseline(baseline_value, timestamp=None, db_path=DB_PATH):
+    """Record a baseline PM2.5 value."""
+    execute_write(INSERT_BASELINE, (timestamp or now_string(), baseline_value), db_path)
+
+
+def get_last_user_control(default="OFF", db_path=DB_PATH):
+    """Return the most recent user_control input, or default if the table is empty."""
+    return fetch_one_value(SELECT_LAST_USER_CONTROL, default=default, db_path=db_path)
+
+
+def get_last_filter_state(default="OFF", db_path=DB_PATH):
+    """Return the most recent filter_state, or default if the table is empty."""
+    return fetch_one_value(SELECT_LAST_FILTER_STATE, default=default, db_path=db_path)
+
+
+def get_last_baseline(default=None, db_path=DB_PATH):
+    """Return the most recent baseline value, or default if the table is empty."""
+    return fetch_one_value(SELECT_LAST_BASELINE, default=default, db_path=db_path)
+
+
+def insert_zerow(table_name, row, db_path):
+    """Insert one (timestamp, pm25, temperature, humidity, wifi_strength, seq) row into a ZeroW table."""
+    execute_write(INSERT_ZEROW.format(table_name), row, db_path)
+
+
+def insert_error_log(row, db_path):
+    """Insert one (timestamp, error_message, error_origin) row into error_log."""
+    execute_write(INSERT_ERROR_LOG, row, db_path)
+
+
+def update_last_seen(node, timestamp, db_path):
+    """Record that node was heard from at timestamp (never moves an entry backwards)."""
+    execute_write(UPSERT_LAST_SEEN, (node, timestamp), db_path)
+
+
+def get_last_seen(db_path):
+    """Return {node: last seen epoch seconds} for every node in last_seen."""
+    return dict(get_connection(db_path).execute(SELECT_LAST_SEEN).fetchall())
+
+
+def insert_reboot_log(node, timestamp, db_path):
+    """Insert one (node, timestamp) row into reboot_log."""
+    execute_write(INSERT_REBOOT_LOG, (node, timestamp), db_path)
@@ -0,0 +1,161 @@
+import ast
+import json
+import math
+import struct
+import time
+
+###################################################
+# ZEROW SENSOR MESSAGE CODEC
+###################################################
+#
+# Nodes used to publish str(sensor_data) and every subscriber parsed it with
+# ast.literal_eval.  Messages are now either:
+#   - binary: a fixed 30-byte little-endian struct, first byte BINARY_VERSION
+#   - JSON:   a JSON object with a "v" version key (for debugging / other tools)
+# decode() accepts both, plus the legacy Python repr from nodes not yet updated,
+# and always returns the dict keys the subscribers already use.
+
+BINARY_VERSION = 0xA1  # Never a valid first byte of a JSON or repr payload
+JSON_VERSION = 1
+
+# version, flags, seq, timestamp, pm2.5, temperature (F), humidity (%), wifi (%), pressure (hPa)
+BINARY_FORMAT = struct.Struct("<BBIIfffff")
+
+# Flag bits for the optional fields
+FLAG_WIFI = 0x01
+FLAG_PRESSURE = 0x02
+
+KEY_PM25 = "PM2.5"
+KEY_TEMPERATURE = "Temperature (F)"
+KEY_HUMIDITY = "Humidity (%)"
+KEY_WIFI = "Wifi Strength"
+KEY_PRESSURE = "Pressure (hPa)"
+
+
+def encode(sensor_data, seq=0, timestamp=None, binary=True):
+    """
+    Encode a ZeroW reading for publishing.
+
+    Parameters:
+        sensor_data (dict): Uses the keys "PM2.5", "Temperature (F)", "Humidity (%)" and
+            optionally "Wifi Strength" and "Pressure (hPa)".
+        seq (int): Per-node message sequence number.
+        timestamp (int): Epoch seconds the reading was taken; defaults to now.
+        binary (bool): Pack as the fixed binary layout, otherwise as JSON.
+
+    Returns:
+        bytes: MQTT payload.
+    """
+    timestamp = int(time.time()) if timestamp is None else int(timestamp)
+    wifi = sensor_data.get(KEY_WIFI)
+    pressure = sensor_data.get(KEY_PRESSURE)
+
+    if not binary:
+        message = {"v": JSON_VERSION, "seq": seq, "timestamp": timestamp}
+        message.update({key: value for key, value in sensor_data.items() if value is not None})
+        return json.dumps(message).encode("utf-8")
+
+    flags = (FLAG_WIFI if wifi is not None else 0) | (FLAG_PRESSURE if pressure is not None else 0)
+    return BINARY_FORMAT.pack(
+        BINARY_VERSION, flags, seq & 0xFFFFFFFF, timestamp,
+        sensor_data.get(KEY_PM25, 0.0),
+        sensor_data.get(KEY_TEMPERATURE, 0.0),
+        sensor_data.get(KEY_HUMIDITY, 0.0),
+        wifi if wifi is not None else math.nan,
+        pressure if pressure is not None else math.nan,
+    )
+
+
+def decode(payload):
+    """
+    Decode a ZeroW message in any supported format.
+
+    Returns:
+        dict: "PM2.5", "Temperature (F)", "Humidity (%)", plus "Wifi Strength" /
+            "Pressure (hPa)" when present, and "seq"/"timestamp" when the sender set them.
+
+    Raises:
+        ValueError: If the payload is not a recognised message.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+
+    if payload[:1] == bytes([BINARY_VERSION]):
+        try:
+            _, flags, seq, timestamp, pm25, temperature, humidity, wifi, pressure = BINARY_FORMAT.unpack(payload)
+        except struct.error as e:
+            raise ValueError(f"Malformed binary sensor message: {e}")
+        data = {
+            KEY_PM25: pm25,
+            KEY_TEMPERATURE: temperature,
+            KEY_HUMIDITY: humidity,
+            "seq": seq,
+            "timestamp": timestamp,
+        }
+        if flags & FLAG_WIFI:
+            data[KEY_WIFI] = wifi
+        if flags & FLAG_PRESSURE:
+            data[KEY_PRESSURE] = pressure
+        return data
+
+    text = payload.decode("utf-8").strip()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        # Legacy nodes publishing str(dict)
+        try:
+            data = ast.literal_eval(text)
+        except (ValueError, SyntaxError) as e:
+            raise ValueError(f"Unrecognised sensor message: {e}")
+    if not isinstance(data, dict):
+        raise ValueError(f"Unrecognised sensor message: {text[:50]}")
+    data.pop("v", None)
+    return data
+
+
+def encode_row(row):
+    """Encode one database row (tuple) for hub-to-hub transfer as a JSON array."""
+    return json.dumps(list(row)).encode("utf-8")
+
+
+def decode_row(payload):
+    """Decode a row from encode_row, or the legacy str(tuple) form, into a tuple."""
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+    try:
+        row = json.loads(payload)
+    except json.JSONDecodeError:
+        try:
+            row = ast.literal_eval(payload)
+        except (ValueError, SyntaxError) as e:
+            raise ValueError(f"Unrecognised row message: {e}")
+    if not isinstance(row, (list, tuple)):
+        raise ValueError(f"Unrecognised row message: {payload[:50]}")
+    return tuple(row)
+
+
+def benchmark(count=10000):
+    """Compare decode throughput of each format with the legacy ast.literal_eval path."""
+    sample = {KEY_PM25: 12.3, KEY_TEMPERATURE: 71.6, KEY_HUMIDITY: 45.2, KEY_WIFI: 82.0}
+    payloads = {
+        "legacy repr + literal_eval": (str(sample).encode("utf-8"),
+                                       lambda p: ast.literal_eval(p.decode("utf-8"))),
+        "json": (encode(sample, 1, binary=False), decode),
+        "binary": (encode(sample, 1), decode),
+    }
+    results = {}
+    for name, (payload, decoder) in payloads.items():
+        start = time.perf_counter()
+        for _ in range(count):
+            decoder(payload)
+        elapsed = time.perf_counter() - start
+        results[name] = elapsed
+        print(f"{name:28s} {len(payload):4d} bytes  {count / elapsed:10.0f} msgs/s")
+    baseline = results["legacy repr + literal_eval"]
+    for name in ("json", "binary"):
+        print(f"{name} speed-up vs literal_eval: {baseline / results[name]:.1f}x")
+    return results
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,76 @@
+import time
+import json
+import secrets
+import string
+
+import numpy as np
+
+###################################################
+# MULTI-THRESHOLD RISING-EDGE SWEEP
+###################################################
+#
+# "Every reading in the window is above (1 + t) x baseline" is the same as
+# "the window minimum is above (1 + t) x baseline", so any number of candidate
+# thresholds can be decided with one min() over the window and one vectorized
+# comparison, and logged as a single columnar record per sample.
+
+# Default candidates, matching BASELINE_THRESHOLD1..4 in the detection tests
+THRESHOLDS = np.array([0.1, 0.2, 0.3, 0.4])
+
+# One JSON line per sample holding every threshold's relay state
+SWEEP_LOG_FILE_PATH = "sweep.json"
+
+
+def generate_random_key():
+    """Generate a random 8-character alphanumeric key for each entry."""
+    characters = string.ascii_letters + string.digits
+    return ''.join(secrets.choice(characters) for _ in range(8))
+
+
+def evaluate_thresholds(window, baseline_pm25, thresholds=THRESHOLDS):
+    """
+    Decide the relay state for every threshold in one pass over the window.
+
+    Parameters:
+        window (sequence of float): The PM2.5 readings to test.
+        baseline_pm25 (float): Baseline PM2.5 value.
+        thresholds (array of float): Fractions above baseline, e.g. 0.1 for +10%.
+
+    Returns:
+        np.ndarray: Boolean array, True where every reading is above (1 + t) x baseline.
+    """
+    window = np.asarray(window, dtype=float)
+    thresholds = np.asarray(thresholds, dtype=float)
+    if window.size == 0:
+        return np.zeros(thresholds.shape, dtype=bool)
+    return window.min() > (1 + thresholds) * baseline_pm25
+
+
+def relay_states(above):
+    """Convert the boolean result of evaluate_thresholds to a list of 'ON'/'OFF'."""
+    return ['ON' if flag else 'OFF' for flag in above]
+
+
+def log_sweep(pm2_5, states, temperature, humidity, baseline_pm25, thresholds=THRESHOLDS,
+              log_file_path=SWEEP_LOG_FILE_PATH):
+    """
+    Append one columnar record with every threshold's relay state to the sweep log.
+
+    The record keeps the "timestamp" and "pm2_5" keys of the old main1.json rows
+    so the rising-edge history can be read back from this file.
+    """
+    try:
+        with open(log_file_path, "a") as json_file:
+            entry = {
+                "timestamp": int(time.time()),  # Add UNIX timestamp
+                "key": generate_random_key(),  # Generate a new random key for each entry
+                "pm2_5": pm2_5,
+                "temperature": temperature,
+                "humidity": humidity,
+                "baseline_pm25": baseline_pm25,
+                "thresholds": [float(t) for t in thresholds],
+                "relay_states": list(states),
+            }
+            json_file.write(json.dumps(entry) + "\n")
+    except Exception as e:
+        print(f"Error writing to JSON file: {str(e)}")
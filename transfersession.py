@@ -0,0 +1,245 @@
+import time
+import json
+import uuid
+import queue
+import logging
+
+import sapphiresdb
+import hubtransfer
+
+###################################################
+# ACKNOWLEDGED, RESUMABLE TRANSFER SESSIONS
+###################################################
+#
+# The receiver (Startdatatransfer.py) opens a session by publishing
+# {"command": "Start", "session": id} on START_TOPIC.  The sender
+# (Initiatetransfer.py) streams each table's new rows as hubtransfer chunks,
+# keeping up to WINDOW chunks in flight.  The receiver answers every chunk on
+# ACK_TOPIC/<session> once it is committed; chunks not acknowledged within
+# ACK_TIMEOUT are sent again.  The sender's watermark only advances over
+# contiguously acknowledged chunks, so a session cut short by a broker drop
+# or a restart resumes where the receiver's data ends.  Throughput and ETA
+# are printed and published on PROGRESS_TOPIC/<session>; each table's last
+# report has done=True and its final status ("complete" or "failed").
+
+START_TOPIC = 'Initiate Transfer'
+ACK_TOPIC = 'Transfer ack/{}'
+PROGRESS_TOPIC = 'Transfer progress/{}'
+
+# Chunks in flight per table before waiting for acknowledgements
+WINDOW = 8
+# Seconds before an unacknowledged chunk is sent again
+ACK_TIMEOUT = 30
+# Sends of one chunk (while connected) before the session gives up
+MAX_ATTEMPTS = 5
+# Seconds before resending a chunk the receiver rejected, doubled on every further rejection
+NACK_BACKOFF = 2
+# Seconds between progress reports
+PROGRESS_INTERVAL = 5
+
+SESSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transfer_session (
+    session_id TEXT,
+    table_name TEXT,
+    started INTEGER,
+    start_rowid INTEGER,
+    end_rowid INTEGER,
+    rows INTEGER,
+    seconds REAL,
+    status TEXT
+);
+"""
+
+# session id -> queue of acknowledgements, filled from the MQTT network thread
+_ack_queues = {}
+
+
+def new_session_id():
+    """Return a new random session id."""
+    return uuid.uuid4().hex[:12]
+
+
+def encode_start(session_id):
+    return json.dumps({"command": "Start", "session": session_id}).encode("utf-8")
+
+
+def parse_start(payload):
+    """Return the session id of a start request, a new one for the legacy "Start", or None."""
+    text = payload.decode("utf-8", errors="replace").strip()
+    if text == "Start":
+        return new_session_id()
+    try:
+        message = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    if isinstance(message, dict) and message.get("command") == "Start" and message.get("session"):
+        return str(message["session"])
+    return None
+
+
+def chunk_range(payload, rows):
+    """Return (chunk_id, last_rowid) of a received chunk, columnar or JSON."""
+    header = hubtransfer.read_chunk_header(payload)
+    if header:
+        return header[0], header[1]
+    return rows[0][0] - 1, rows[-1][0]
+
+
+def encode_ack(table_name, chunk_id, last_rowid, ok=True):
+    return json.dumps({"table": table_name, "chunk_id": chunk_id, "last_rowid": last_rowid, "ok": ok}).encode("utf-8")
+
+
+def encode_progress(table_name, acked_rows, total_rows, rows_per_second, eta_seconds, status=None):
+    """Progress report; status is the table's final status, None while it is still sending."""
+    return json.dumps({
+        "table": table_name, "acked_rows": acked_rows, "total_rows": total_rows,
+        "rows_per_second": rows_per_second, "eta_seconds": eta_seconds,
+        "done": status is not None, "status": status,
+    }).encode("utf-8")
+
+
+def handle_ack(topic, payload):
+    """Route an acknowledgement received on ACK_TOPIC/<session> to its running session."""
+    session_id = topic.rsplit("/", 1)[-1]
+    ack_queue = _ack_queues.get(session_id)
+    if ack_queue is None:
+        return
+    try:
+        ack_queue.put(json.loads(payload))
+    except json.JSONDecodeError as e:
+        logging.warning(f"Ignoring malformed ack for session {session_id}: {e}")
+
+
+def _record_session(db_path, session_id, table_name, started, start_rowid, end_rowid, rows, seconds, status):
+    conn = sapphiresdb.get_connection(db_path)
+    with conn:
+        conn.execute(
+            "INSERT INTO transfer_session (session_id, table_name, started, start_rowid, end_rowid, rows, seconds, status) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (session_id, table_name, started, start_rowid, end_rowid, rows, seconds, status)
+        )
+
+
+def _report_progress(client, session_id, table_name, acked_rows, total_rows, elapsed, status=None):
+    rate = acked_rows / elapsed if elapsed > 0 else 0.0
+    eta = (total_rows - acked_rows) / rate if rate > 0 else None
+    eta_text = f"{eta:.0f}s" if eta is not None else "unknown"
+    print(f"[{session_id}] {table_name}: {acked_rows}/{total_rows} rows, {rate:.0f} rows/s, ETA {eta_text}")
+    client.publish(PROGRESS_TOPIC.format(session_id),
+                   encode_progress(table_name, acked_rows, total_rows, rate, eta, status), qos=1)
+
+
+def send_table(client, session_id, db_path, table_name, topic, ack_queue):
+    """
+    Stream the rows of table_name past its watermark and wait for every chunk to be acknowledged.
+
+    Returns:
+        str: "complete" or "failed" (the watermark keeps everything acknowledged so far).
+    """
+    start_rowid = watermark = hubtransfer.get_watermark(db_path, table_name)
+    total_rows = hubtransfer.count_pending(db_path, table_name, watermark)
+    chunks = hubtransfer.fetch_chunks(db_path, table_name, watermark)
+    in_flight = {}  # chunk_id -> {"payload", "last_rowid", "rows", "due", "attempts"}
+    acked = {}  # chunk_id -> (last_rowid, rows), waiting for the chunks before them
+    acked_rows = 0
+    read_after = watermark
+    exhausted = False
+    status = "complete"
+    started = time.time()
+    start = last_report = time.monotonic()
+
+    def send(chunk_id):
+        chunk = in_flight[chunk_id]
+        client.publish(topic, chunk["payload"], qos=1)
+        # Resent unless acknowledged by then
+        chunk["due"] = time.monotonic() + ACK_TIMEOUT
+        chunk["attempts"] += 1
+
+    while True:
+        # Keep the window full
+        while not exhausted and len(in_flight) < WINDOW:
+            rows = next(chunks, None)
+            if rows is None:
+                exhausted = True
+                break
+            # Chunk id = rowid the chunk was read after, i.e. the previous chunk's last rowid
+            chunk_id, read_after = read_after, rows[-1][0]
+            in_flight[chunk_id] = {
+                "payload": hubtransfer.encode_chunk(rows, chunk_id=chunk_id),
+                "last_rowid": rows[-1][0], "rows": len(rows), "due": 0, "attempts": 0,
+            }
+            send(chunk_id)
+        if not in_flight:
+            break
+
+        try:
+            ack = ack_queue.get(timeout=0.5)
+        except queue.Empty:
+            ack = None
+        if ack and ack.get("table") == table_name and ack.get("chunk_id") in in_flight:
+            chunk_id = ack["chunk_id"]
+            if ack.get("ok"):
+                chunk = in_flight.pop(chunk_id)
+                acked[chunk_id] = (chunk["last_rowid"], chunk["rows"])
+                acked_rows += chunk["rows"]
+            else:
+                # Receiver could not verify or store it (e.g. locked database): back off
+                # before resending, and let the attempt limit below end a persistent failure
+                chunk = in_flight[chunk_id]
+                chunk["due"] = time.monotonic() + NACK_BACKOFF * 2 ** max(0, chunk["attempts"] - 1)
+                logging.info(f"[{session_id}] Chunk {chunk_id} of {table_name} rejected by the receiver")
+
+        # Advance the watermark over contiguously acknowledged chunks
+        advanced = False
+        while watermark in acked:
+            watermark, _ = acked.pop(watermark)
+            advanced = True
+        if advanced:
+            hubtransfer.set_watermark(db_path, table_name, watermark)
+
+        now = time.monotonic()
+        if client.is_connected():
+            for chunk_id, chunk in in_flight.items():
+                if now < chunk["due"]:
+                    continue
+                if chunk["attempts"] >= MAX_ATTEMPTS:
+                    status = "failed"
+                    break
+                logging.info(f"[{session_id}] Resending chunk {chunk_id} of {table_name}")
+                send(chunk_id)
+            if status == "failed":
+                print(f"[{session_id}] {table_name}: giving up after {MAX_ATTEMPTS} attempts, resumable from rowid {watermark}")
+                break
+        else:
+            # Broker dropped: don't burn attempts, retransmit after the reconnect
+            for chunk in in_flight.values():
+                chunk["due"] = max(chunk["due"], now + ACK_TIMEOUT)
+
+        if now - last_report >= PROGRESS_INTERVAL:
+            _report_progress(client, session_id, table_name, acked_rows, total_rows, now - start)
+            last_report = now
+
+    elapsed = time.monotonic() - start
+    _report_progress(client, session_id, table_name, acked_rows, total_rows, elapsed, status)
+    _record_session(db_path, session_id, table_name, int(started), start_rowid, watermark, acked_rows, elapsed, status)
+    return status
+
+
+def run_session(client, session_id, db_path, tables, topic_prefix):
+    """
+    Run one transfer session over tables, oldest rows first.
+
+    The caller's MQTT client must be subscribed to ACK_TOPIC.format("#") and
+    pass those messages to handle_ack().
+    """
+    sapphiresdb.create_tables(db_path, SESSION_SCHEMA)
+    ack_queue = _ack_queues[session_id] = queue.Queue()
+    try:
+        statuses = {}
+        for table_name in tables:
+            statuses[table_name] = send_table(client, session_id, db_path, table_name,
+                                              f"{topic_prefix}{table_name}", ack_queue)
+        return statuses
+    finally:
+        del _ack_queues[session_id]
+        sapphiresdb.close_connections()
@@ -0,0 +1,96 @@
+import time
+import logging
+from collections import deque
+
+###################################################
+# WI-FI LINK QUALITY FROM /proc/net/wireless
+###################################################
+#
+# Replaces spawning iwconfig for every sample.  The kernel exposes the same
+# numbers in /proc/net/wireless:
+#
+#   Inter-| sta-|   Quality        |   Discarded packets ...
+#    face | tus | link level noise |  nwid  crypt   frag ...
+#    wlan0: 0000   58.  -52.  -256        0      0      0 ...
+#
+# Reads are cached for CACHE_TTL seconds and every fresh read is added to a
+# rolling RSSI history.
+
+WIRELESS_PATH = '/proc/net/wireless'
+# Seconds a reading is reused before /proc is read again
+CACHE_TTL = 10
+# Fresh readings kept for the rolling average
+HISTORY_SIZE = 30
+
+# Same dBm -> percentage scale the iwconfig parser used
+MAX_SIGNAL_DBM = -30
+MIN_SIGNAL_DBM = -100
+
+_cache = {"time": None, "value": None}
+rssi_history = deque(maxlen=HISTORY_SIZE)
+
+
+def dbm_to_percentage(dbm):
+    """Map a signal level in dBm onto 0-100 %."""
+    return max(0, min(100, (dbm - MIN_SIGNAL_DBM) / (MAX_SIGNAL_DBM - MIN_SIGNAL_DBM) * 100))
+
+
+def read_wireless(interface=None, path=WIRELESS_PATH):
+    """
+    Parse /proc/net/wireless.
+
+    Parameters:
+        interface (str): Interface to report; defaults to the first one listed.
+
+    Returns:
+        dict: interface, link (quality), level_dbm and noise_dbm, or None if no wireless interface.
+    """
+    with open(path, "r") as f:
+        lines = f.readlines()[2:]  # Two header lines
+    for line in lines:
+        name, _, values = line.partition(":")
+        name = name.strip()
+        if interface and name != interface:
+            continue
+        fields = values.split()
+        if len(fields) < 4:
+            continue
+        return {
+            "interface": name,
+            "link": float(fields[1].rstrip(".")),
+            "level_dbm": float(fields[2].rstrip(".")),
+            "noise_dbm": float(fields[3].rstrip(".")),
+        }
+    return None
+
+
+def get_signal(interface=None, ttl=CACHE_TTL):
+    """Return the cached read_wireless() result, re-reading /proc when older than ttl seconds."""
+    now = time.monotonic()
+    if _cache["time"] is not None and now - _cache["time"] < ttl:
+        return _cache["value"]
+    try:
+        value = read_wireless(interface)
+    except (OSError, ValueError) as e:
+        logging.error(f"Error reading {WIRELESS_PATH}: {e}")
+        value = None
+    _cache["time"] = now
+    _cache["value"] = value
+    if value is not None:
+        rssi_history.append(value["level_dbm"])
+    return value
+
+
+def get_wifi_strength(interface=None, ttl=CACHE_TTL):
+    """Return the current signal strength as 0-100 %, or None if unavailable."""
+    signal = get_signal(interface, ttl)
+    if signal is None:
+        return None
+    return dbm_to_percentage(signal["level_dbm"])
+
+
+def get_rssi_average():
+    """Return the rolling average signal level in dBm over the last HISTORY_SIZE readings, or None."""
+    if not rssi_history:
+        return None
+    return sum(rssi_history) / len(rssi_history)
@@ -1,66 +1,112 @@
 import time
+import fcntl
+import argparse
 import paho.mqtt.client as mqtt
-import smbus2
-import bme280
-from sps30 import SPS30
 import logging
-import subprocess
+
+import hardware
+import sensorcodec
+import wifisignal
+import zerowspool
 
 mqtt_username = "SAPPHIRE"
 mqtt_password = "SAPPHIRE"
 broker_address = "10.42.0.1"
 mqtt_topic = "ZeroW2"
 
+# Seconds between readings in agent mode
+SAMPLE_INTERVAL = 60
+# Log the per-cycle timing summary every this many cycles
+TIMING_LOG_EVERY = 10
+# Seconds to wait for the broker at start-up before spooling readings
+CONNECT_TIMEOUT = 5
+# Seconds a one-shot run may spend replaying spooled readings
+ONCE_REPLAY_SECONDS = 20
+# Seconds to wait for a live reading's PUBACK before spooling it for replay
+PUBACK_TIMEOUT = 10
+# Held while a run owns the sensors, so cron ticks never stack up behind an agent
+LOCK_PATH = '/home/zerow1/zerow.lock'
+
 
-logging.basicConfig(filename='/home/zerow1/logfile.log',level=logging.DEBUG, format='%(asctime)s %(message)')
+logging.basicConfig(filename='/home/zerow1/logfile.log',level=logging.DEBUG, format='%(asctime)s %(message)s')
 
-def on_publish(client, userdata, result):
+def on_publish(client, userdata, mid, reason_code=None, properties=None):
     pass
 
-client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-client.username_pw_set(mqtt_username, mqtt_password)
-client.on_publish = on_publish
-client.connect(broker_address, 1883, 60)
+def on_connect(client, userdata, flags, reason_code, properties):
+    logging.info(f"Connected to MQTT broker with result code {reason_code}")
+
+def on_disconnect(client, userdata, flags, reason_code, properties):
+    logging.warning(f"Disconnected from MQTT broker with result code {reason_code}")
 
 
 # BME280 sensor address (default address)
 address = 0x76
 
-# Initialize I2C bus
-bus = smbus2.SMBus(1)
+# Opened once by setup() and reused for every reading
+client = None
+bus = None
+calibration_params = None
+sps30 = None
+
+# Live readings published but not yet acknowledged: [(seq, payload, MQTTMessageInfo, deadline)]
+_unacked = []
+
 
-# Load calibration parameters
-calibration_params = bme280.load_calibration_params(bus, address)
+def setup():
+    """Open the MQTT session, I2C bus, BME280 calibration and SPS30 once."""
+    global client, bus, calibration_params, sps30
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    client.username_pw_set(mqtt_username, mqtt_password)
+    client.on_publish = on_publish
+    client.on_connect = on_connect
+    client.on_disconnect = on_disconnect
+    client.reconnect_delay_set(min_delay=1, max_delay=60)
+    # Connect in the background so a missing broker spools readings instead of aborting
+    client.connect_async(broker_address, 1883, 60)
+    # Network thread keeps the session alive and reconnects between readings
+    client.loop_start()
+    connect_deadline = time.monotonic() + CONNECT_TIMEOUT
+    while not client.is_connected() and time.monotonic() < connect_deadline:
+        time.sleep(0.1)
 
-sps30 = SPS30(port=1)
+    # Initialize I2C bus
+    bus = hardware.SMBus(1)
+
+    # Load calibration parameters
+    calibration_params = hardware.bme280.load_calibration_params(bus, address)
+
+    sps30 = hardware.SPS30(port=1)
+
+
+def teardown():
+    """Spool unacknowledged readings, then close the MQTT session and I2C bus."""
+    try:
+        spool_unacked(force=True)
+    except Exception as e:
+        logging.error(f"Error spooling unacknowledged readings: {e}")
+    if client is not None:
+        client.loop_stop()
+        client.disconnect()
+    if bus is not None:
+        bus.close()
 
 
 def celsius_to_fahrenheit(celsius):
     return (celsius * 9 / 5) + 32
 
 def get_wifi_strength():
-    try:
-        result = subprocess.run(['/usr/sbin/iwconfig'], capture_output=True, text=True)
-        output_lines = result.stdout.split('\n')
-        
-        for line in output_lines:
-            if 'Signal level=' in line:
-                signal_strength = line.split('Signal level=')[-1].split(' ')[0]
-                signal_strength_dbm = int(signal_strength.replace('dBm', ''))
-                max_signal_strength = -30
-                min_signal_strength = -100
-                signal_strength_percentage = max(0, min(100, (signal_strength_dbm - min_signal_strength)/(max_signal_strength - min_signal_strength)*100))
-                return signal_strength_percentage
-    except Exception as e:
-        logging.error(f"Error getting wifi strength: {e}")
+    # Read from /proc/net/wireless, cached for wifisignal.CACHE_TTL seconds
+    return wifisignal.get_wifi_strength()
 
 
-try:
+def read_sensor_data():
+    """Take one SPS30 + BME280 reading and return it as a sensor_data dict."""
     sps30.read_measured_values()
-    data = bme280.sample(bus, address, calibration_params)
+    data = hardware.bme280.sample(bus, address, calibration_params)
     pm25 = sps30.dict_values['pm2p5']
 
-    temperature_celsius = data.temperature   
+    temperature_celsius = data.temperature
     humidity = data.humidity
     temperature = celsius_to_fahrenheit(temperature_celsius)
 
@@ -75,14 +121,163 @@ try:
         sensor_data["Wifi Strength"] = wifi_strength
     else:
         logging.warning("unable to retrieve wifi strength")
-        
-        
-    client.publish(mqtt_topic, str(sensor_data), qos=1)
+    return sensor_data
+
+
+def publish_reading(sensor_data):
+    """
+    Publish one reading with the next sequence number and return its MQTTMessageInfo.
+
+    While the broker is unreachable the reading is spooled instead (and None
+    returned); drain_spool() replays it later.  A published reading is spooled
+    by spool_unacked() if its PUBACK does not arrive within PUBACK_TIMEOUT.
+    """
+    seq = zerowspool.next_seq()
+    payload = sensorcodec.encode(sensor_data, seq)
+    if client.is_connected():
+        info = client.publish(mqtt_topic, payload, qos=1)
+        if info.rc == mqtt.MQTT_ERR_SUCCESS:
+            _unacked.append((seq, payload, info, time.monotonic() + PUBACK_TIMEOUT))
+            return info
+        logging.warning(f"Publish failed ({mqtt.error_string(info.rc)}), spooling reading {seq}")
+    zerowspool.append(seq, payload)
+    return None
+
+
+def spool_unacked(force=False):
+    """
+    Spool published readings whose PUBACK is overdue (all unacknowledged ones if force).
+
+    The hub ignores a reading it already stored (same seq and timestamp), so
+    replaying one whose PUBACK was merely lost is harmless.
+    """
+    now = time.monotonic()
+    waiting = []
+    for seq, payload, info, deadline in _unacked:
+        if info.is_published():
+            continue
+        if force or now >= deadline:
+            logging.warning(f"No PUBACK for reading {seq}, spooling it")
+            zerowspool.append(seq, payload)
+        else:
+            waiting.append((seq, payload, info, deadline))
+    _unacked[:] = waiting
+
+
+def drain_spool(deadline):
+    """Replay spooled readings until deadline (time.monotonic()) if connected."""
+    if not client.is_connected() or not zerowspool.pending_count():
+        return
+    replayed = zerowspool.drain(client, mqtt_topic, deadline)
+    if replayed:
+        logging.info(f"Replayed {replayed} spooled readings, {zerowspool.pending_count()} left")
+
+
+def sample_once():
+    """Read and publish one sample; return (read_ms, publish_ms, MQTTMessageInfo)."""
+    start = time.perf_counter()
+    sensor_data = read_sensor_data()
+    read_done = time.perf_counter()
+    info = publish_reading(sensor_data)
+    publish_done = time.perf_counter()
     print(sensor_data)
-  
+    return (read_done - start) * 1000, (publish_done - read_done) * 1000, info
+
+
+def run_agent(interval=SAMPLE_INTERVAL):
+    """
+    Sample every interval seconds until interrupted.
+
+    Readings are scheduled against time.monotonic() so slow cycles do not make
+    the sample times drift.  The read/publish/cycle timings are logged every
+    TIMING_LOG_EVERY cycles.
+    """
+    timings = []
+    next_sample = time.monotonic()
+    while True:
+        cycle_start = time.perf_counter()
+        try:
+            read_ms, publish_ms, _ = sample_once()
+            timings.append((read_ms, publish_ms, (time.perf_counter() - cycle_start) * 1000))
+        except Exception as e:
+            logging.error(f"An error occurred: {e}")
+
+        if len(timings) >= TIMING_LOG_EVERY:
+            read_avg, publish_avg, cycle_avg = (sum(column) / len(timings) for column in zip(*timings))
+            cycle_max = max(timing[2] for timing in timings)
+            rssi_avg = wifisignal.get_rssi_average()
+            rssi_text = f"{rssi_avg:.1f} dBm" if rssi_avg is not None else "n/a"
+            logging.info(
+                f"{len(timings)} cycles: read {read_avg:.1f}ms, publish {publish_avg:.1f}ms, "
+                f"cycle {cycle_avg:.1f}ms avg / {cycle_max:.1f}ms max, RSSI avg {rssi_text}"
+            )
+            timings = []
+
+        next_sample += interval
+        # Backfill any outage in the idle time before the next live reading
+        try:
+            spool_unacked()
+            drain_spool(next_sample - 1)
+        except Exception as e:
+            logging.error(f"Error replaying spool: {e}")
+
+        delay = next_sample - time.monotonic()
+        if delay < 0:
+            # Overran the interval; skip the missed slots instead of bursting
+            next_sample = time.monotonic()
+            delay = 0
+        time.sleep(delay)
+
+
+def acquire_lock(path=LOCK_PATH):
+    """Return an open, exclusively locked file, or None if another run holds the lock."""
+    lock_file = open(path, "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ZeroW SPS30/BME280 sensor publisher")
+    parser.add_argument("--agent", action="store_true",
+                        help="keep running and sample every --interval seconds (default: one reading, for cron)")
+    parser.add_argument("--once", action="store_true", help="publish a single reading and exit (the default)")
+    parser.add_argument("--interval", type=float, default=SAMPLE_INTERVAL, help="seconds between readings in --agent mode")
+    args = parser.parse_args()
+
+    # The lock is released when the process exits
+    lock_file = acquire_lock()
+    if lock_file is None:
+        logging.info("Another zerow.py run holds the sensors; exiting")
+        return
+
+    try:
+        setup()
+        if not args.agent or args.once:
+            _, _, info = sample_once()
+            # Let the network thread deliver the message before disconnecting
+            if info is not None:
+                try:
+                    info.wait_for_publish(timeout=PUBACK_TIMEOUT)
+                except (RuntimeError, ValueError) as e:
+                    logging.warning(f"Error waiting for PUBACK: {e}")
+            # Not acknowledged: keep it for the next run instead of losing it
+            spool_unacked(force=True)
+            drain_spool(time.monotonic() + ONCE_REPLAY_SECONDS)
+        else:
+            run_agent(args.interval)
+    except KeyboardInterrupt:
+        if sps30 is not None:
+            sps30.stop_measurement()
+        print("\nKeyboard interrupt detected. SPS30 and BME280 turned off.")
+    except Exception as e:
+        logging.error(f"An error occurred: {e}")
+    finally:
+        teardown()
+
 
-except KeyboardInterrupt:
-    sps.stop_measurement()
-    print("\nKeyboard interrupt detected. SPS30 and BME280 turned off.")
-except Exception as e:
-    logging.error(f"An error occurred: {e}")
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import time
+import logging
+import paho.mqtt.client as mqtt
+
+import sapphiresdb
+
+###################################################
+# STORE-AND-FORWARD SPOOL FOR ZEROW NODES
+###################################################
+#
+# Readings that cannot be published (broker down, Wi-Fi lost) are appended to
+# a small SQLite spool on the node, keyed by the message sequence number, and
+# replayed in batches once the connection is back.  Each payload is the
+# encoded sensorcodec message with its original timestamp, so the hub files
+# replayed readings at the time they were taken.
+
+SPOOL_PATH = '/home/zerow1/spool.db'
+# Oldest readings are discarded beyond this (about 70 days at one per minute)
+MAX_SPOOL_ROWS = 100000
+# Messages published per replay batch before waiting for their PUBACKs
+REPLAY_BATCH = 50
+# Upper bound on replayed messages per second, so live readings keep priority
+REPLAY_RATE = 20
+# Seconds to wait for a batch to be acknowledged before giving up until later
+ACK_TIMEOUT = 10
+
+SPOOL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spool (
+    seq INTEGER PRIMARY KEY,
+    payload BLOB
+);
+
+CREATE TABLE IF NOT EXISTS spool_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER
+);
+"""
+
+_initialized = set()
+
+
+def _get_connection(spool_path):
+    """Return the pooled connection for spool_path, creating the tables on first use."""
+    if spool_path not in _initialized:
+        sapphiresdb.create_tables(spool_path, SPOOL_SCHEMA)
+        _initialized.add(spool_path)
+    return sapphiresdb.get_connection(spool_path)
+
+
+def next_seq(spool_path=SPOOL_PATH):
+    """Return the next message sequence number; persisted so it survives restarts."""
+    conn = _get_connection(spool_path)
+    with conn:
+        conn.execute(
+            "INSERT INTO spool_meta (key, value) VALUES ('seq', 1) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + 1"
+        )
+        return conn.execute("SELECT value FROM spool_meta WHERE key = 'seq'").fetchone()[0]
+
+
+def append(seq, payload, spool_path=SPOOL_PATH):
+    """Spool one encoded message, dropping the oldest beyond MAX_SPOOL_ROWS."""
+    conn = _get_connection(spool_path)
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO spool (seq, payload) VALUES (?, ?)", (seq, payload))
+        conn.execute(
+            "DELETE FROM spool WHERE seq <= (SELECT MAX(seq) FROM spool) - ?",
+            (MAX_SPOOL_ROWS,)
+        )
+
+
+def pending_count(spool_path=SPOOL_PATH):
+    """Return the number of spooled messages."""
+    return _get_connection(spool_path).execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+
+def drain(client, topic, deadline=None, spool_path=SPOOL_PATH):
+    """
+    Replay spooled messages, oldest first, while the client stays connected.
+
+    Each batch of REPLAY_BATCH messages is published at QoS 1 and only deleted
+    from the spool once every message in it has been acknowledged; a batch that
+    times out stays spooled for the next attempt.  Batches are spaced so replay
+    never exceeds REPLAY_RATE messages per second.
+
+    Parameters:
+        client (mqtt.Client): Connected client with its network loop running.
+        topic (str): Topic to publish to.
+        deadline (float): time.monotonic() value to stop at, e.g. the next sample time.
+
+    Returns:
+        int: Number of messages replayed and removed from the spool.
+    """
+    conn = _get_connection(spool_path)
+    replayed = 0
+    while client.is_connected() and (deadline is None or time.monotonic() < deadline):
+        batch = conn.execute("SELECT seq, payload FROM spool ORDER BY seq LIMIT ?", (REPLAY_BATCH,)).fetchall()
+        if not batch:
+            break
+
+        batch_start = time.monotonic()
+        infos = [client.publish(topic, payload, qos=1) for _, payload in batch]
+        ack_deadline = batch_start + ACK_TIMEOUT
+        try:
+            for info in infos:
+                if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                    raise RuntimeError(mqtt.error_string(info.rc))
+                info.wait_for_publish(timeout=max(0, ack_deadline - time.monotonic()))
+                if not info.is_published():
+                    raise RuntimeError("timed out waiting for PUBACK")
+        except (RuntimeError, ValueError) as e:
+            logging.warning(f"Spool replay paused after {replayed} messages: {e}")
+            break
+
+        with conn:
+            conn.executemany("DELETE FROM spool WHERE seq = ?", [(seq,) for seq, _ in batch])
+        replayed += len(batch)
+
+        # Throttle to REPLAY_RATE
+        delay = batch_start + len(batch) / REPLAY_RATE - time.monotonic()
+        if deadline is not None:
+            delay = min(delay, deadline - time.monotonic())
+        if delay > 0:
+            time.sleep(delay)
+    return replayed